@@ -0,0 +1,112 @@
+# allowlist.py
+"""
+Списки разрешённых слов: внутренние термины, фамилии, названия продуктов.
+Слова из списков не считаются ошибками и не проверяются в spylls.
+
+Файлы - обычный текст UTF-8, одно слово в строке, строки с # - комментарии:
+    allowlists/organisation.txt      - общий список организации
+    allowlists/users/<логин>.txt     - личный список пользователя
+
+Регистр учитывается так же, как в словаре: «росатом» разрешает и «Росатом», и «РОСАТОМ»,
+а «Росатом» - только написания с заглавной буквы.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from typing import Iterable, List, Optional
+
+from wordforms import case_variants
+
+logger = logging.getLogger(__name__)
+
+ALLOWLIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'allowlists')
+ORGANISATION_FILE = 'organisation.txt'
+
+def user_allowlist_path(login: str, directory: str = ALLOWLIST_DIR) -> str:
+    """Файл личного списка пользователя; символы логина вне [\\w.-] заменяются на '_'."""
+    return os.path.join(directory, 'users', re.sub(r'[^\w.-]', '_', login) + '.txt')
+
+def read_allowlist(path: str) -> set:
+    """Слова из файла списка (пустые строки и комментарии пропускаются)."""
+    words = set()
+    with open(path, encoding='utf-8-sig') as f:
+        for line in f:
+            word = line.split('#', 1)[0].strip()
+            if word:
+                words.add(word)
+    return words
+
+class Allowlist:
+    """
+    Объединение нескольких файлов списков в одно множество в памяти.
+    Файлы перечитываются без перезапуска: перед проверкой сравнивается время изменения файлов
+    (не чаще, чем раз в check_interval секунд). Отсутствующий файл считается пустым списком.
+    """
+
+    def __init__(self, paths: Iterable[str], check_interval: float = 2.0):
+        """
+        :param paths: Файлы списков (например, список организации и личный список).
+        :param check_interval: Как часто (в секундах) проверять, не изменились ли файлы.
+        """
+        self.paths = list(paths)
+        self.check_interval = check_interval
+        self.words = frozenset()
+        self._mtimes = {}
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def _stat(self) -> dict:
+        mtimes = {}
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                mtimes[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Перечитывает списки, если файлы изменились.
+
+        :return: True, если списки перечитаны.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked < self.check_interval:
+            return False
+        with self._lock:
+            self._checked = now
+            mtimes = self._stat()
+            if not force and mtimes == self._mtimes:
+                return False
+            words = set()
+            for path, mtime in mtimes.items():
+                if mtime is None:
+                    continue
+                try:
+                    words |= read_allowlist(path)
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.warning(f"Не удалось прочитать список разрешённых слов {path}: {e}")
+            self.words = frozenset(words)  # Замена целиком: параллельные проверки видят старый или новый список
+            self._mtimes = mtimes
+        logger.info(f"Списки разрешённых слов загружены: {len(self.words)} слов из {self.paths}")
+        return True
+
+    def accepts(self, word: str) -> bool:
+        """Есть ли слово (или его вариант регистра) в списках."""
+        words = self.words
+        return any(variant in words for variant in case_variants(word))
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+def load_allowlist(login: Optional[str] = None, directory: str = ALLOWLIST_DIR) -> Allowlist:
+    """Список организации и, если задан логин, личный список пользователя."""
+    paths: List[str] = [os.path.join(directory, ORGANISATION_FILE)]
+    if login:
+        paths.append(user_allowlist_path(login, directory))
+    return Allowlist(paths)
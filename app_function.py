@@ -6,6 +6,8 @@ from typing import Tuple, List, Optional
 
 from utiles import insert_highlights
 from taskes import *  # Импортирует все задачи
+from engine import apply_formats_single_pass, detect_format_spans
+from rules import RULES
 import pandas as pd  # Если требуется в дальнейшем
 
 logger = logging.getLogger(__name__)
@@ -24,66 +26,83 @@ task2func = {
     '25. Удаление множественных пробелов': task25
 }
 
-def apply_format(doc: Document, func, desc: str) -> Tuple[Document, List[str], List[Tuple[int, int]], List[Tuple[int, int]]]:
+def apply_format(doc: Document, func, desc: str, detect_only: bool = False,
+                 stats: Optional[dict] = None) -> Tuple[Document, List[str], List[Tuple[int, int]], List[Tuple[int, int]]]:
     """
     Применяет форматирующую функцию и возвращает обновленный документ, историю изменений,
-    а также пустые списки для error_spans и fix_spans.
+    а также error_spans и fix_spans.
+    
+    :param detect_only: Если True, документ не изменяется, а error_spans и fix_spans
+                        заполняются спанами в координатах engine.document_text.
+    :param stats: Если передан словарь, он заполняется статистикой задачи (см. apply_selected_formats);
+                  задача выполняется движком по её правилу, результат совпадает с func(doc).
     """
-    doc, history = func(doc)
-    error_spans = []  # Пустой список, так как не используется
-    fix_spans = []    # Пустой список, так как не используется
+    if detect_only:
+        history, _, error_spans, fix_spans = detect_format_spans(doc, [desc])
+        return doc, history, error_spans, fix_spans
+    if stats is not None and desc in RULES:
+        doc, history = apply_formats_single_pass(doc, [desc], stats=stats)
+    else:
+        doc, history = func(doc)
+    error_spans = []  # При изменении документа спаны не вычисляются
+    fix_spans = []
     return doc, history, error_spans, fix_spans
 
-def apply_all_formats(doc: Document) -> Tuple[Document, List[str], List[Tuple[int, int]], List[Tuple[int, int]]]:
+def apply_all_formats(doc: Document, mode: str = 'run', detect_only: bool = False,
+                      stats: Optional[dict] = None) -> Tuple[Document, List[str], List[Tuple[int, int]], List[Tuple[int, int]]]:
     """
-    Применяет все форматирующие задачи из task2func.
+    Применяет все форматирующие задачи из task2func за один обход документа.
     
     :param doc: Объект документа.
+    :param mode: Режим применения правил: 'run' или 'paragraph'.
+    :param detect_only: Только найти правки (см. apply_selected_formats).
+    :param stats: Словарь для статистики по задачам (см. apply_selected_formats).
     :return: Кортеж (обновлённый документ, история изменений, error_spans, fix_spans).
     """
-    history = []
-    error_spans = []
-    fix_spans = []
-    for desc, func in task2func.items():
-        logger.debug(f"Применение задачи: {desc}")
-        doc, func_history, func_error_spans, func_fix_spans = apply_format(doc, func, desc)
-        history.extend(func_history)
-        error_spans.extend(func_error_spans)
-        fix_spans.extend(func_fix_spans)
-    return doc, history, error_spans, fix_spans
+    return apply_selected_formats(doc, list(task2func.keys()), mode=mode, detect_only=detect_only, stats=stats)
 
-def apply_selected_formats(doc: Document, selected_tasks: List[str]) -> Tuple[Document, List[str], List[Tuple[int, int]], List[Tuple[int, int]]]:
+def apply_selected_formats(doc: Document, selected_tasks: List[str], mode: str = 'run', detect_only: bool = False,
+                           state: Optional[dict] = None,
+                           stats: Optional[dict] = None) -> Tuple[Document, List[str], List[Tuple[int, int]], List[Tuple[int, int]]]:
     """
     Применяет выбранные форматирующие задачи.
+    Документ обходится один раз: к каждому run применяются все выбранные задачи по порядку.
+    
+    :param mode: 'run' - правила применяются к каждому run отдельно;
+                 'paragraph' - к тексту параграфа целиком (находит совпадения на стыке runs).
+    :param detect_only: Если True, документ не изменяется: возвращаются error_spans
+                        (в исходном тексте) и fix_spans (в тексте после правил).
+    :param state: Состояние между проходами: повторно обрабатываются только изменившиеся
+                  параграфы и ячейки таблиц (см. engine.apply_formats_single_pass).
+    :param stats: Если передан словарь, он заполняется статистикой прохода: общее время,
+                  а в stats['tasks'] по каждой задаче - время, обойденные параграфы и runs,
+                  изменённые runs и вызовы regex (строки для таблицы - engine.stats_rows).
+                  В режиме detect_only не заполняется.
     """
-    history = []      # История изменений
-    error_spans = []  # Пустой список
-    fix_spans = []    # Пустой список
+    if detect_only:
+        history, _, error_spans, fix_spans = detect_format_spans(doc, selected_tasks, mode=mode)
+        return doc, history, error_spans, fix_spans
+
+    error_spans = []  # При изменении документа спаны не вычисляются
+    fix_spans = []
 
-    for desc in selected_tasks:
-        func = task2func.get(desc)
-        if func:
-            logger.debug(f"Применение задачи: {desc}")
-            doc, func_history, func_error_spans, func_fix_spans = apply_format(doc, func, desc)
-            history.extend(func_history)
-            error_spans.extend(func_error_spans)
-            fix_spans.extend(func_fix_spans)
-        else:
-            logger.warning(f"Форматирующая задача с описанием '{desc}' не найдена.")
+    logger.debug(f"Применение задач: {selected_tasks}")
+    doc, history = apply_formats_single_pass(doc, selected_tasks, mode=mode, state=state, stats=stats)
 
     return doc, history, error_spans, fix_spans
 
-def get_all_spans(doc: Document, selected_tasks: Optional[List[str]] = None) -> Tuple[List[str], List[Tuple[int, int]], List[Tuple[int, int]]]:
+def get_all_spans(doc: Document, selected_tasks: Optional[List[str]] = None, mode: str = 'run') -> Tuple[List[str], List[Tuple[int, int]], List[Tuple[int, int]]]:
     """
     Получает все истории изменений и спаны ошибок/исправлений для выбранных задач.
+    Документ не изменяется.
     
     :param doc: Объект документа.
-    :param selected_tasks: Список выбранных задач. Если None, применяются все задачи.
+    :param selected_tasks: Список выбранных задач. Если None, используются все задачи.
+    :param mode: Режим применения правил: 'run' или 'paragraph'.
     :return: Кортеж (history, error_spans, fix_spans).
     """
     if selected_tasks is None:
-        doc, history, error_spans, fix_spans = apply_all_formats(doc)
-    else:
-        doc, history, error_spans, fix_spans = apply_selected_formats(doc, selected_tasks)
+        selected_tasks = list(task2func.keys())
+    history, _, error_spans, fix_spans = detect_format_spans(doc, selected_tasks, mode=mode)
     
-    return history, error_spans, fix_spans
\ No newline at end of file
+    return history, error_spans, fix_spans
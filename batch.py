@@ -0,0 +1,244 @@
+# batch.py
+"""
+Пакетная обработка .docx без интерфейса Streamlit.
+
+Пример:
+    python batch.py ./memos --out ./checked --workers 8
+    python batch.py "./memos/**/*.docx" --out ./checked --tasks 3,10,12 --mode paragraph
+"""
+
+import os
+import glob
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
+
+import docx
+
+from allowlist import load_allowlist
+from app_function import apply_selected_formats, task2func
+from dictionaries import ensure_snapshot
+from engine import FORMAT_MODES
+from spelling import DICTIONARY_PATH, load_spell_checker, find_errors_in_doc
+from streaming import format_docx_streaming
+from utiles import normalize_runs
+from wordforms import load_word_forms
+
+logger = logging.getLogger(__name__)
+
+# Словарь и список разрешённых слов организации процесса-обработчика: загружаются один раз в initializer пула
+_dictionary = None
+_allowlist = None
+
+def _init_worker(dictionary_path: Optional[str]):
+    """
+    Загружает словарь в процесс-обработчик пула.
+    Кэш lookup/suggest общий для всех документов этого процесса.
+    """
+    global _dictionary, _allowlist
+    if dictionary_path:
+        _dictionary = load_spell_checker(dictionary_path)
+        _allowlist = load_allowlist()
+
+def collect_inputs(inputs: List[str]) -> List[str]:
+    """
+    Собирает список .docx файлов по каталогам и glob-шаблонам.
+    Временные файлы Word (~$...) пропускаются.
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = glob.glob(os.path.join(item, '**', '*.docx'), recursive=True)
+        else:
+            candidates = glob.glob(item, recursive=True)
+        for path in sorted(candidates):
+            if os.path.basename(path).startswith('~$') or not path.lower().endswith('.docx'):
+                continue
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+def select_tasks(spec: Optional[str]) -> List[str]:
+    """
+    Переводит номера задач ('3,10,12') в ключи task2func. Пустое значение - все задачи.
+    """
+    if not spec:
+        return list(task2func.keys())
+    numbers = {number.strip() for number in spec.split(',') if number.strip()}
+    selected = [desc for desc in task2func if desc.split('.', 1)[0] in numbers]
+    unknown = numbers - {desc.split('.', 1)[0] for desc in selected}
+    if unknown:
+        raise ValueError(f"Неизвестные номера задач: {', '.join(sorted(unknown))}")
+    return selected
+
+def process_document(path: str, output_stem: str, out_dir: str, selected_tasks: List[str],
+                     mode: str = 'run', spelling: bool = True, streaming: bool = False) -> dict:
+    """
+    Проверяет орфографию и применяет форматирующие задачи к одному документу.
+    Сохраняет исправленный .docx и JSON-отчёт в out_dir.
+
+    :param streaming: Обрабатывать word/document.xml потоком, без python-docx (для очень больших файлов).
+    :return: Краткая сводка по документу.
+    """
+    timings = {}
+    started = time.perf_counter()
+    output_path = os.path.join(out_dir, f'{output_stem}.docx')
+    dictionary = _dictionary if spelling else None
+
+    if streaming:
+        stats = format_docx_streaming(path, output_path, selected_tasks, mode=mode, dictionary=dictionary,
+                                      allowlist=_allowlist)
+        history = stats['history']
+        errors = stats['errors']
+        counts = {'blocks': stats['blocks'], 'paragraphs': stats['paragraphs'], 'runs_removed': stats['runs_removed']}
+    else:
+        doc = docx.Document(path)
+        runs = normalize_runs(doc)
+        timings['read'] = time.perf_counter() - started
+
+        errors = []
+        if dictionary is not None:
+            step = time.perf_counter()
+            errors = find_errors_in_doc(doc, dictionary, allowlist=_allowlist)
+            timings['spelling'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        doc, history, _, _ = apply_selected_formats(doc, selected_tasks, mode=mode)
+        timings['formatting'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        doc.save(output_path)
+        timings['write'] = time.perf_counter() - step
+        counts = {'paragraphs': len(doc.paragraphs), 'tables': len(doc.tables),
+                  'runs_removed': runs['runs_removed']}
+    timings['total'] = time.perf_counter() - started
+
+    report = {
+        'file': path,
+        'output': output_path,
+        'size_bytes': os.path.getsize(path),
+        **counts,
+        'history': history,
+        'errors': errors,
+        'timings': timings,
+    }
+    report_path = os.path.join(out_dir, f'{output_stem}.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    return {
+        'file': path,
+        'output': output_path,
+        'report': report_path,
+        'size_bytes': report['size_bytes'],
+        'errors': len(errors),
+        'timings': timings,
+    }
+
+def _output_stems(paths: List[str]) -> List[str]:
+    """Имена выходных файлов без расширения; одинаковые имена из разных каталогов нумеруются."""
+    stems = []
+    used = set()
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        candidate = stem
+        counter = 1
+        while candidate in used:
+            counter += 1
+            candidate = f'{stem}_{counter}'
+        used.add(candidate)
+        stems.append(candidate)
+    return stems
+
+def run_batch(paths: List[str], out_dir: str, selected_tasks: List[str], workers: Optional[int] = None,
+              mode: str = 'run', spelling: bool = True, dictionary_path: str = DICTIONARY_PATH,
+              streaming: bool = False) -> dict:
+    """
+    Обрабатывает документы на пуле процессов; в каждом процессе загружается свой словарь.
+
+    :return: Сводка: число документов, ошибки обработки и показатели пропускной способности.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+    if spelling:
+        # Снимок словаря собирается один раз, процессы пула загружают его, а не разбирают .aff/.dic
+        try:
+            ensure_snapshot(dictionary_path)
+            load_word_forms(dictionary_path)  # Индекс словоформ тоже собирается до запуска пула
+        except OSError as e:
+            logger.warning(f"Не удалось подготовить снимок словаря: {e}")
+    results = []
+    failures = []
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(dictionary_path if spelling else None,)) as executor:
+        futures = {
+            executor.submit(process_document, path, stem, out_dir, selected_tasks, mode, spelling, streaming): path
+            for path, stem in zip(paths, _output_stems(paths))
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                results.append(future.result())
+                logger.info(f"Обработан файл: {path}")
+            except Exception as e:
+                logger.error(f"Ошибка обработки файла {path}: {e}")
+                failures.append({'file': path, 'error': str(e)})
+
+    elapsed = time.perf_counter() - started
+    total_bytes = sum(result['size_bytes'] for result in results)
+    summary = {
+        'documents': len(paths),
+        'processed': len(results),
+        'failed': len(failures),
+        'failures': failures,
+        'spelling_errors': sum(result['errors'] for result in results),
+        'elapsed_seconds': elapsed,
+        'documents_per_second': len(results) / elapsed if elapsed else 0.0,
+        'megabytes_per_second': total_bytes / 1024 / 1024 / elapsed if elapsed else 0.0,
+        'stage_seconds': {
+            stage: sum(result['timings'].get(stage, 0.0) for result in results)
+            for stage in ('read', 'spelling', 'formatting', 'write', 'total')
+        },
+        'results': sorted(results, key=lambda result: result['file']),
+    }
+    with open(os.path.join(out_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Пакетная проверка орфографии и форматирования .docx файлов")
+    parser.add_argument('inputs', nargs='+', help="Каталоги или glob-шаблоны с .docx файлами")
+    parser.add_argument('--out', required=True, help="Каталог для исправленных файлов и отчётов")
+    parser.add_argument('--workers', type=int, default=None, help="Число процессов (по умолчанию - число ядер)")
+    parser.add_argument('--tasks', default=None, help="Номера форматирующих задач через запятую (по умолчанию - все)")
+    parser.add_argument('--mode', choices=FORMAT_MODES, default='run', help="Режим применения правил")
+    parser.add_argument('--no-spelling', action='store_true', help="Не проверять орфографию")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Потоковая обработка word/document.xml без python-docx (для очень больших файлов)")
+    parser.add_argument('--dictionary', default=DICTIONARY_PATH, help="Путь к словарю без расширения")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+    paths = collect_inputs(args.inputs)
+    if not paths:
+        parser.error("Не найдено ни одного .docx файла")
+    try:
+        selected_tasks = select_tasks(args.tasks)
+    except ValueError as e:
+        parser.error(str(e))
+
+    summary = run_batch(paths, args.out, selected_tasks, workers=args.workers, mode=args.mode,
+                        spelling=not args.no_spelling, dictionary_path=args.dictionary,
+                        streaming=args.streaming)
+    print(f"Обработано: {summary['processed']} из {summary['documents']}, ошибок обработки: {summary['failed']}")
+    print(f"Время: {summary['elapsed_seconds']:.2f} с, "
+          f"{summary['documents_per_second']:.2f} док/с, {summary['megabytes_per_second']:.2f} МБ/с")
+    return 1 if summary['failed'] else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,384 @@
+# benchmark.py
+"""
+Набор замеров производительности на синтетических .docx документах.
+
+Пример:
+    python benchmark.py --scales 50,200,1000 --out bench.json
+    python benchmark.py --scales 50,200 --no-spelling --compare bench.json
+    python benchmark.py --lookup 20000
+    python benchmark.py --suggest 50
+"""
+
+import io
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import statistics
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import docx
+
+from app_function import apply_all_formats, task2func
+from blocks import get_blocks
+from dictionaries import CachedDictionary
+from spelling import (
+    DICTIONARY_PATH, load_dictionary_files, find_errors_in_text, make_error_record, scan_tokens, tokenize,
+    highlight_errors_in_doc, apply_user_selected_corrections_doc,
+    convert_docx_to_html as convert_spelling_html,
+)
+from symspell import load_symspell
+from utiles import convert_docx_to_html as convert_format_html
+from wordforms import load_word_forms
+
+logger = logging.getLogger(__name__)
+
+# Слова, которые есть в словаре ru_RU
+WORDS = [
+    'отдел', 'документ', 'проверка', 'договор', 'работа', 'компания', 'решение', 'сумма', 'отчет',
+    'год', 'месяц', 'срок', 'основание', 'приказ', 'служба', 'порядок', 'контроль', 'результат',
+    'объем', 'средства', 'бюджет', 'план', 'услуга', 'поставка', 'оплата', 'счет', 'акт',
+    'подписал', 'направил', 'согласовал', 'представил', 'утвердил', 'выполнил', 'провел',
+    'в', 'на', 'по', 'для', 'и', 'с', 'о', 'от', 'при', 'без',
+    'новый', 'текущий', 'годовой', 'финансовый', 'внутренний', 'основной', 'полный',
+]
+
+# Фрагменты, на которые срабатывают форматирующие задачи
+PATTERNS = [
+    'Сотрудник', 'Выявлено', 'п. 5', 'пп. 3.1', '№ 12', '10 %', '3 млн. руб', '2 тыс', 'млрд.',
+    'и / или', '2020 - 2021', 'слово  слово', 'т.е.',
+]
+
+def misspell(word: str, rng: random.Random) -> str:
+    """Портит слово: переставляет две соседние буквы или удваивает букву."""
+    i = rng.randrange(1, len(word) - 1)
+    if word[i] != word[i + 1] and rng.random() < 0.5:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + word[i] + word[i:]
+
+def _paragraph_runs(rng: random.Random, words: int, runs: int, params: dict, misspelled: Dict[str, str]) -> List[Tuple[str, bool]]:
+    """Тексты runs одного параграфа и признак курсива."""
+    tokens = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        if len(word) > 3 and rng.random() < params['misspelled_share']:
+            wrong = misspell(word, rng)
+            misspelled[wrong] = word
+            word = wrong
+        elif rng.random() < params['quote_share']:
+            word = f'"{word}"'
+        elif rng.random() < params['pattern_share']:
+            word = rng.choice(PATTERNS)
+        tokens.append(word)
+    tokens[0] = tokens[0].capitalize()
+
+    runs = max(1, min(runs, len(tokens)))
+    bounds = sorted(rng.sample(range(1, len(tokens)), runs - 1)) if runs > 1 else []
+    pieces = []
+    start = 0
+    for end in bounds + [len(tokens)]:
+        text = ' '.join(tokens[start:end]) + (' ' if end < len(tokens) else '.')
+        pieces.append((text, rng.random() < params['italic_share']))
+        start = end
+    return pieces
+
+def generate_document(paragraphs: int = 100, tables: int = 2, rows: int = 4, cols: int = 3,
+                      words_per_paragraph: int = 12, runs_per_paragraph: int = 3,
+                      misspelled_share: float = 0.03, italic_share: float = 0.1, quote_share: float = 0.03,
+                      pattern_share: float = 0.05, seed: int = 0) -> Tuple[docx.Document, Dict[str, str]]:
+    """
+    Создаёт синтетическую докладную записку заданного размера.
+    Таблицы равномерно распределяются между параграфами.
+
+    :param misspelled_share: Доля слов с опечатками.
+    :param italic_share: Доля runs с курсивом.
+    :param quote_share: Доля слов в прямых кавычках.
+    :param pattern_share: Доля фрагментов, на которые срабатывают форматирующие задачи.
+    :param seed: Зерно генератора: одинаковые параметры дают одинаковый документ.
+    :return: Кортеж (документ, словарь опечаток {слово с опечаткой: исходное слово}).
+    """
+    rng = random.Random(seed)
+    params = {
+        'misspelled_share': misspelled_share,
+        'italic_share': italic_share,
+        'quote_share': quote_share,
+        'pattern_share': pattern_share,
+    }
+    misspelled = {}
+    doc = docx.Document()
+    table_every = paragraphs // tables if tables else 0
+
+    for i in range(paragraphs):
+        para = doc.add_paragraph()
+        for text, italic in _paragraph_runs(rng, words_per_paragraph, runs_per_paragraph, params, misspelled):
+            para.add_run(text).italic = italic or None
+        if table_every and (i + 1) % table_every == 0 and len(doc.tables) < tables:
+            table = doc.add_table(rows=rows, cols=cols)
+            for row in table.rows:
+                for cell in row.cells:
+                    para = cell.paragraphs[0]
+                    for text, italic in _paragraph_runs(rng, rng.randint(2, 6), 1, params, misspelled):
+                        para.add_run(text).italic = italic or None
+    return doc, misspelled
+
+def known_error_records(doc: docx.Document, misspelled: Dict[str, str]) -> List[dict]:
+    """
+    Записи об ошибках (как у find_errors_in_doc) по известным опечаткам генератора,
+    без обращения к словарю: замеры подсветки и применения исправлений не зависят от spylls.
+    """
+    records = []
+    for block in get_blocks(doc):
+        for para_idx, para in enumerate(block['paragraphs']):
+            for idx, token in enumerate(scan_tokens(para.text)):
+                if token.text in misspelled:
+                    error = {'index': idx, 'original': token.text, 'start': token.start, 'end': token.end,
+                             'kind': token.kind, 'suggestions': [misspelled[token.text]]}
+                    records.append(make_error_record(block, para_idx, error))
+    return records
+
+def _measure(func: Callable, setup: Callable[[], tuple], repeat: int) -> List[float]:
+    """Время вызова func(*setup()) в секундах; подготовка аргументов в замер не входит."""
+    times = []
+    for _ in range(repeat):
+        args = setup()
+        started = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - started)
+    return times
+
+def run_scale(paragraphs: int, repeat: int = 3, dictionary=None, spelling_sample: int = 10, seed: int = 0,
+              corpus_dir: Optional[str] = None) -> List[dict]:
+    """
+    Замеряет все функции на документе из paragraphs параграфов (и paragraphs // 50 таблиц).
+
+    :return: Список результатов: имя функции, размер, время (минимум и медиана).
+    """
+    doc, misspelled = generate_document(paragraphs=paragraphs, tables=max(1, paragraphs // 50), seed=seed)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    data = buffer.getvalue()
+    if corpus_dir:
+        with open(f'{corpus_dir}/synthetic_{paragraphs}.docx', 'wb') as f:
+            f.write(data)
+
+    def fresh() -> docx.Document:
+        return docx.Document(io.BytesIO(data))
+
+    records = known_error_records(doc, misspelled)
+    texts = [para.text for para in doc.paragraphs[:spelling_sample]]
+    selected = {record['checkbox_key']: True for record in records}
+    highlighted = highlight_errors_in_doc(fresh(), records)
+
+    cases = []
+    for desc, func in task2func.items():
+        name = desc.split('.', 1)[0]
+        cases.append((f'task{name}', func, lambda: (fresh(),)))
+    cases += [
+        ('apply_all_formats', apply_all_formats, lambda: (fresh(),)),
+        ('highlight_errors_in_doc', highlight_errors_in_doc, lambda: (fresh(), records)),
+        ('apply_user_selected_corrections_doc', apply_user_selected_corrections_doc,
+         lambda: (fresh(), records, selected)),
+        ('utiles.convert_docx_to_html', convert_format_html, lambda: (fresh(),)),
+        ('spelling.convert_docx_to_html', convert_spelling_html, lambda: (highlighted,)),
+    ]
+    if dictionary is not None:
+        cases.append(('find_errors_in_text', lambda: [find_errors_in_text(text, dictionary) for text in texts],
+                      lambda: ()))
+
+    results = []
+    for name, func, setup in cases:
+        times = _measure(func, setup, 1 if name == 'find_errors_in_text' else repeat)
+        results.append({
+            'name': name,
+            'paragraphs': paragraphs,
+            'errors': len(records),
+            'items': len(texts) if name == 'find_errors_in_text' else paragraphs,
+            'seconds_min': min(times),
+            'seconds_median': statistics.median(times),
+        })
+        logger.info(f"{name} [{paragraphs}]: {min(times):.4f} с")
+    return results
+
+def compare_results(current: dict, baseline: dict, threshold: float = 1.5) -> List[dict]:
+    """
+    Сравнивает результаты с сохранёнными ранее.
+
+    :return: Замеры, время которых выросло больше чем в threshold раз.
+    """
+    old = {(item['name'], item['paragraphs']): item['seconds_min'] for item in baseline['results']}
+    regressions = []
+    for item in current['results']:
+        before = old.get((item['name'], item['paragraphs']))
+        if before and item['seconds_min'] / before > threshold:
+            regressions.append({**item, 'baseline_seconds': before, 'ratio': item['seconds_min'] / before})
+    return regressions
+
+def run_benchmark(scales: List[int], repeat: int = 3, spelling: bool = True, dictionary_path: str = DICTIONARY_PATH,
+                  spelling_sample: int = 10, seed: int = 0, corpus_dir: Optional[str] = None) -> dict:
+    """Выполняет замеры на всех размерах и возвращает результат в виде словаря для JSON."""
+    dictionary = load_dictionary_files(dictionary_path) if spelling else None
+    results = []
+    for paragraphs in scales:
+        results.extend(run_scale(paragraphs, repeat=repeat, dictionary=dictionary,
+                                 spelling_sample=spelling_sample, seed=seed, corpus_dir=corpus_dir))
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scales': scales,
+            'repeat': repeat,
+            'seed': seed,
+            'spelling_sample': spelling_sample if spelling else 0,
+        },
+        'results': results,
+    }
+
+def lookup_tokens(dictionary, count: int, seed: int = 0) -> List[str]:
+    """
+    Поток слов для замера lookup: текст синтетического документа (повторяющиеся слова и опечатки)
+    вперемешку со случайными основами словаря в разном регистре.
+    """
+    rng = random.Random(seed)
+    doc, _ = generate_document(paragraphs=max(1, count // 40), tables=0, seed=seed)
+    tokens = [token for para in doc.paragraphs for token in tokenize(para.text)][:count // 2]
+    stems = rng.sample([word.stem for word in dictionary.dic.words], count - len(tokens))
+    tokens += [rng.choice((str.lower, str.capitalize, str.upper))(stem) for stem in stems]
+    rng.shuffle(tokens)
+    return tokens
+
+def run_lookup_benchmark(dictionary_path: str = DICTIONARY_PATH, count: int = 20000, repeat: int = 3,
+                         seed: int = 0) -> List[dict]:
+    """
+    Пропускная способность проверки слов: lookup spylls, множество словоформ и
+    CachedDictionary со словоформами (spylls только для слов не из множества, кэш пустой в начале замера).
+
+    :return: Список результатов: имя, число слов, принятых слов, время и слов в секунду.
+    """
+    dictionary = load_dictionary_files(dictionary_path)
+    forms = load_word_forms(dictionary_path, dictionary=dictionary)
+    tokens = lookup_tokens(dictionary, count, seed)
+    cases = [('spylls.lookup', lambda: dictionary.lookup)]
+    if forms is not None:
+        cases += [
+            ('WordForms.accepts', lambda: forms.accepts),
+            ('CachedDictionary(forms).lookup', lambda: CachedDictionary(dictionary, forms=forms).lookup),
+        ]
+
+    results = []
+    for name, make_check in cases:
+        check = make_check()
+        accepted = sum(1 for token in tokens if check(token))
+        times = _measure(lambda check: [check(token) for token in tokens], lambda: (make_check(),), repeat)
+        results.append({
+            'name': name,
+            'tokens': len(tokens),
+            'accepted': accepted,
+            'seconds_min': min(times),
+            'tokens_per_second': len(tokens) / min(times),
+        })
+        logger.info(f"{name}: {len(tokens) / min(times):.0f} слов/с")
+    return results
+
+def run_suggest_benchmark(dictionary_path: str = DICTIONARY_PATH, count: int = 50, seed: int = 0) -> List[dict]:
+    """
+    Сравнивает подбор вариантов spylls и индекса SymSpell на count словах словаря, испорченных misspell:
+    задержку одного запроса, долю совпадений первого варианта со spylls и долю восстановленных слов.
+
+    :return: Список результатов по движкам (пустой список для SymSpell, если индекс не собран).
+    """
+    rng = random.Random(seed)
+    dictionary = load_dictionary_files(dictionary_path)
+    words = [word.stem for word in rng.sample(dictionary.dic.words, count * 2) if len(word.stem) > 3][:count]
+    queries = [(word, misspell(word, rng)) for word in words]
+    engines = [('spylls.suggest', dictionary)]
+    index = load_symspell(dictionary_path)
+    if index is None:
+        logger.warning("Индекс SymSpell не собран: python symspell.py --build ru_RU")
+    else:
+        engines.append(('SymSpellIndex.suggest', index))
+
+    reference = {}
+    results = []
+    for name, engine in engines:
+        times = []
+        top = {}
+        for word, query in queries:
+            started = time.perf_counter()
+            suggestions = list(engine.suggest(query))  # suggest spylls - генератор: полный список, как в приложении
+            times.append(time.perf_counter() - started)
+            top[query] = suggestions[0] if suggestions else None
+        if not reference:
+            reference = top
+        results.append({
+            'name': name,
+            'queries': len(queries),
+            'seconds_median': statistics.median(times),
+            'seconds_max': max(times),
+            'top1_matches_spylls': sum(top[query] == reference[query] for _, query in queries) / len(queries),
+            'top1_is_original': sum(top[query] == word for word, query in queries) / len(queries),
+        })
+        logger.info(f"{name}: медиана {statistics.median(times):.4f} с на слово")
+    return results
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Замеры производительности на синтетических .docx документах")
+    parser.add_argument('--scales', default='50,200,1000', help="Размеры документов в параграфах через запятую")
+    parser.add_argument('--repeat', type=int, default=3, help="Число повторов каждого замера")
+    parser.add_argument('--seed', type=int, default=0, help="Зерно генератора документов")
+    parser.add_argument('--no-spelling', action='store_true', help="Не замерять find_errors_in_text (без словаря)")
+    parser.add_argument('--spelling-sample', type=int, default=10,
+                        help="Число параграфов для замера find_errors_in_text (подбор вариантов в spylls медленный)")
+    parser.add_argument('--dictionary', default=DICTIONARY_PATH, help="Путь к словарю без расширения")
+    parser.add_argument('--corpus-dir', default=None, help="Каталог для сохранения сгенерированных документов")
+    parser.add_argument('--out', default=None, help="Файл для результатов в JSON")
+    parser.add_argument('--compare', default=None, help="JSON предыдущего запуска для поиска регрессий")
+    parser.add_argument('--threshold', type=float, default=1.5, help="Допустимое замедление относительно --compare")
+    parser.add_argument('--lookup', type=int, default=0, metavar='N',
+                        help="Замерить пропускную способность проверки N слов (spylls и множество словоформ)")
+    parser.add_argument('--suggest', type=int, default=0, metavar='N',
+                        help="Сравнить подбор вариантов spylls и SymSpell на N испорченных словах")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    if args.suggest:
+        print(f"{'Подбор':24} {'Слов':>6} {'Медиана, с':>11} {'Макс, с':>9} {'Top-1 = spylls':>15} {'Top-1 = слово':>14}")
+        for item in run_suggest_benchmark(args.dictionary, args.suggest, seed=args.seed):
+            print(f"{item['name']:24} {item['queries']:>6} {item['seconds_median']:>11.4f} {item['seconds_max']:>9.4f} "
+                  f"{item['top1_matches_spylls']:>15.0%} {item['top1_is_original']:>14.0%}")
+        return 0
+
+    if args.lookup:
+        print(f"{'Проверка':32} {'Слов':>8} {'Принято':>8} {'Мин, с':>9} {'Слов/с':>11}")
+        for item in run_lookup_benchmark(args.dictionary, args.lookup, repeat=args.repeat, seed=args.seed):
+            print(f"{item['name']:32} {item['tokens']:>8} {item['accepted']:>8} "
+                  f"{item['seconds_min']:>9.4f} {item['tokens_per_second']:>11.0f}")
+        return 0
+
+    scales = [int(scale) for scale in args.scales.split(',') if scale.strip()]
+    report = run_benchmark(scales, repeat=args.repeat, spelling=not args.no_spelling,
+                           dictionary_path=args.dictionary, spelling_sample=args.spelling_sample,
+                           seed=args.seed, corpus_dir=args.corpus_dir)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"{'Функция':40} {'Параграфов':>10} {'Мин, с':>10} {'Медиана, с':>11}")
+    for item in report['results']:
+        print(f"{item['name']:40} {item['paragraphs']:>10} {item['seconds_min']:>10.4f} {item['seconds_median']:>11.4f}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare_results(report, json.load(f), args.threshold)
+        for item in regressions:
+            print(f"Регрессия: {item['name']} [{item['paragraphs']}]: "
+                  f"{item['baseline_seconds']:.4f} -> {item['seconds_min']:.4f} с (x{item['ratio']:.2f})")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,183 @@
+# blocks.py
+
+from typing import Callable, Iterator, List, Optional
+from docx import Document
+from docx.oxml.ns import qn
+from docx.table import Table, _Cell
+from docx.text.paragraph import Paragraph
+
+# Блоки основного текста: их обрабатывают форматирующие задачи
+BODY_KINDS = ('paragraph', 'cell')
+
+# Атрибут документа с кэшем блоков: (элементы тела, блоки). Кэш хранится в самом документе,
+# а не в словаре модуля: блоки ссылаются на документ (через Paragraph и _Cell), и модульный
+# словарь не давал бы ему освободиться. Копия документа (deepcopy) получает свой список.
+_CACHE_ATTR = '_cached_blocks'
+
+def _make_block(counters: dict, kind: str, element, paragraphs: list, label: str, table: Optional[int] = None,
+                row: Optional[int] = None, col: Optional[int] = None, span: int = 1, parent: Optional[int] = None) -> dict:
+    """Создаёт описание блока и присваивает ему следующий номер."""
+    block = {
+        'id': counters['blocks'],
+        'kind': kind,
+        'element': element,
+        'paragraphs': paragraphs,
+        'label': label,
+        'table': table,
+        'row': row,
+        'col': col,
+        'span': span,
+        'parent': parent,
+    }
+    counters['blocks'] += 1
+    return block
+
+def new_counters() -> dict:
+    """Счётчики обхода: номера блоков, таблиц и параграфов основного текста."""
+    return {'blocks': 0, 'tables': 0, 'paragraphs': 0}
+
+def _table_blocks(tbl, parent, counters: dict, parent_id: Optional[int] = None) -> Iterator[dict]:
+    """
+    Блоки ячеек таблицы по строкам. Каждый w:tc обходится один раз (объединённые ячейки
+    не повторяются, как в row.cells); вложенные таблицы следуют сразу за своей ячейкой.
+    """
+    table = Table(tbl, parent)
+    table_index = counters['tables']
+    counters['tables'] += 1
+    for row_idx, tr in enumerate(tbl.tr_lst):
+        col_idx = 0
+        for tc in tr.tc_lst:
+            cell = _Cell(tc, table)
+            span = tc.grid_span
+            block = _make_block(
+                counters, 'cell', tc, cell.paragraphs,
+                f"Таблица {table_index + 1}, ячейка ({row_idx + 1}, {col_idx + 1})",
+                table=table_index, row=row_idx, col=col_idx, span=span, parent=parent_id,
+            )
+            yield block
+            for nested in tc.tbl_lst:
+                yield from _table_blocks(nested, cell, counters, block['id'])
+            col_idx += span
+
+def iter_element_blocks(element, parent, counters: dict) -> Iterator[dict]:
+    """
+    Блоки одного элемента тела документа: w:p даёт один блок, w:tbl - блоки всех ячеек.
+    Используется и обходом python-docx, и потоковой обработкой (с parent=None).
+
+    :param element: Элемент w:p или w:tbl; прочие элементы пропускаются.
+    :param parent: Родительский объект python-docx (тело документа) или None.
+    :param counters: Счётчики обхода из new_counters().
+    """
+    if element.tag == qn('w:p'):
+        counters['paragraphs'] += 1
+        yield _make_block(counters, 'paragraph', element, [Paragraph(element, parent)],
+                          f"Параграф {counters['paragraphs']}")
+    elif element.tag == qn('w:tbl'):
+        yield from _table_blocks(element, parent, counters)
+
+def build_blocks(doc: Document) -> List[dict]:
+    """
+    Обходит документ один раз и возвращает плоский список блоков в порядке документа:
+    параграфы и ячейки таблиц основного текста (включая вложенные таблицы),
+    затем параграфы колонтитулов. Колонтитулы, которых нет в документе, не создаются.
+    """
+    counters = new_counters()
+    blocks = []
+    body = doc._body
+    for element in doc.element.body.iterchildren():
+        blocks.extend(iter_element_blocks(element, body, counters))
+
+    for sect_idx, sect in enumerate(doc.sections):
+        for kind, part, name in (('header', sect.header, 'Верхний колонтитул'),
+                                 ('footer', sect.footer, 'Нижний колонтитул')):
+            # Связанный с предыдущим разделом колонтитул уже обойдён (или отсутствует)
+            if part.is_linked_to_previous:
+                continue
+            for para_idx, para in enumerate(part.paragraphs):
+                blocks.append(_make_block(counters, kind, para._p, [para],
+                                          f"{name} раздела {sect_idx + 1}, параграф {para_idx + 1}"))
+    return blocks
+
+def _same_body(cached: list, body) -> bool:
+    """Те же ли элементы (по тождеству) и в том же порядке в теле документа, что и при построении кэша."""
+    return len(cached) == len(body) and all(a is b for a, b in zip(cached, body))
+
+def get_blocks(doc: Document, kinds: Optional[tuple] = None) -> List[dict]:
+    """
+    Возвращает список блоков документа, построенный один раз и сохранённый в кэше.
+    Список перестраивается, если в теле документа добавлен, удалён или заменён элемент.
+    Изменения внутри таблиц (строки, ячейки, параграфы ячеек) и колонтитулов не отслеживаются:
+    код, который их меняет, вызывает invalidate_blocks.
+
+    :param doc: Объект Document.
+    :param kinds: Виды блоков ('paragraph', 'cell', 'header', 'footer'); None - все.
+    :return: Список словарей с ключами id, kind, element, paragraphs, label, table, row, col, span, parent.
+    """
+    body = doc.element.body
+    cached = getattr(doc, _CACHE_ATTR, None)
+    if cached is None or not _same_body(cached[0], body):
+        cached = (list(body), build_blocks(doc))
+        setattr(doc, _CACHE_ATTR, cached)
+    blocks = cached[1]
+    if kinds is None:
+        return blocks
+    return [block for block in blocks if block['kind'] in kinds]
+
+def invalidate_blocks(doc: Document):
+    """
+    Сбрасывает кэш блоков. Изменения элементов тела get_blocks замечает сам; сброс нужен после
+    изменений внутри таблиц (add_row, параграфы в ячейках) и колонтитулов.
+    """
+    if getattr(doc, _CACHE_ATTR, None) is not None:
+        setattr(doc, _CACHE_ATTR, None)
+
+def blocks_to_html(blocks: List[dict], paragraph_html: Callable[[dict], str], cell_html: Callable[[dict], str],
+                   table_attrs: str = '', cell_attrs: str = '') -> str:
+    """
+    Собирает HTML из списка блоков: параграфы и колонтитулы через paragraph_html,
+    ячейки через cell_html; вложенные таблицы выводятся внутри своей ячейки.
+
+    :param blocks: Список блоков из get_blocks.
+    :param paragraph_html: Функция, возвращающая HTML блока-параграфа.
+    :param cell_html: Функция, возвращающая HTML содержимого ячейки.
+    :param table_attrs: Атрибуты тега <table>.
+    :param cell_attrs: Атрибуты тега <td>.
+    :return: Строка HTML.
+    """
+    top = []
+    children = {}
+    for block in blocks:
+        if block['parent'] is None:
+            top.append(block)
+        else:
+            children.setdefault(block['parent'], []).append(block)
+
+    def render(items: List[dict]) -> List[str]:
+        parts = []
+        i = 0
+        while i < len(items):
+            block = items[i]
+            if block['kind'] != 'cell':
+                parts.append(paragraph_html(block))
+                i += 1
+                continue
+            table = block['table']
+            row = None
+            parts.append(f'<table{table_attrs}>')
+            while i < len(items) and items[i]['kind'] == 'cell' and items[i]['table'] == table:
+                cell = items[i]
+                if cell['row'] != row:
+                    if row is not None:
+                        parts.append('</tr>')
+                    parts.append('<tr>')
+                    row = cell['row']
+                colspan = f' colspan="{cell["span"]}"' if cell['span'] > 1 else ''
+                parts.append(f'<td{cell_attrs}{colspan}>')
+                parts.append(cell_html(cell))
+                parts.extend(render(children.get(cell['id'], [])))
+                parts.append('</td>')
+                i += 1
+            parts.append('</tr></table>')
+        return parts
+
+    return ''.join(render(top))
@@ -0,0 +1,4 @@
+# conftest.py
+
+# Приложение Streamlit, а не тесты: имя совпадает с шаблоном pytest
+collect_ignore = ['test_spylsya_92.py']
@@ -0,0 +1,383 @@
+# dictionaries.py
+"""
+Загрузка и кэширование словарей spylls.
+
+Сборка снимка словаря (выполняется при развёртывании, чтобы процессы не разбирали .aff/.dic):
+    python dictionaries.py --build ru_RU
+"""
+
+import os
+import gc
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from importlib import metadata
+from typing import Hashable, List, Optional
+
+from spylls.hunspell import Dictionary
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = '.snapshot'
+SNAPSHOT_FORMAT = 1
+
+class LRUCache:
+    """
+    Ограниченный по размеру кэш с вытеснением давно не использованных записей.
+    Потокобезопасен: все операции выполняются под блокировкой.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default=None):
+        """Возвращает значение и помечает запись как недавно использованную."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value):
+        """Сохраняет значение; при переполнении вытесняет самую старую запись."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Счётчики кэша: попадания, промахи, вытеснения, размер и доля попаданий."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+class SuggestionStore:
+    """
+    Постоянный кэш вариантов исправления в SQLite (режим WAL): переживает перезапуск
+    приложения и общий для всех процессов на машине. Записи привязаны к отпечатку словаря
+    и способа подбора, поэтому после обновления словаря старые варианты не используются,
+    а со временем вытесняются.
+
+    Каждый поток получает своё соединение; параллельные чтения не блокируются записью,
+    а конкурентные записи ждут до busy_timeout. Ошибки базы не прерывают проверку:
+    запрос считается промахом, а запись пропускается.
+    """
+
+    # Время последнего использования обновляется при чтении не чаще, чем раз в TOUCH_INTERVAL секунд
+    TOUCH_INTERVAL = 3600
+    # Размер проверяется после каждых EVICT_EVERY записей
+    EVICT_EVERY = 1000
+
+    def __init__(self, path: str, fingerprint: str, max_entries: int = 100_000, busy_timeout: float = 5.0):
+        """
+        :param path: Файл базы SQLite.
+        :param fingerprint: Отпечаток словаря и способа подбора вариантов.
+        :param max_entries: Максимальное число записей; лишние давно не использованные удаляются.
+        :param busy_timeout: Сколько секунд ждать, пока базу держит другой процесс.
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.busy_timeout = busy_timeout
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._writes = 0
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS suggestions ('
+                ' fingerprint TEXT NOT NULL, word TEXT NOT NULL, suggestions TEXT NOT NULL, used INTEGER NOT NULL,'
+                ' PRIMARY KEY (fingerprint, word)) WITHOUT ROWID')
+            conn.execute('CREATE INDEX IF NOT EXISTS suggestions_used ON suggestions (used)')
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')  # В WAL достаточно для кэша: при сбое теряются последние записи
+            self._local.conn = conn
+        return conn
+
+    def get(self, word: str) -> Optional[List[str]]:
+        """Сохранённые варианты исправления слова или None, если их нет."""
+        try:
+            conn = self._connection()
+            row = conn.execute('SELECT suggestions, used FROM suggestions WHERE fingerprint = ? AND word = ?',
+                               (self.fingerprint, word)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            now = int(time.time())
+            if now - row[1] > self.TOUCH_INTERVAL:
+                with conn:
+                    conn.execute('UPDATE suggestions SET used = ? WHERE fingerprint = ? AND word = ?',
+                                 (now, self.fingerprint, word))
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Кэш вариантов недоступен: {e}")
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, word: str, suggestions: List[str]):
+        """Сохраняет варианты исправления слова; при переполнении вытесняет давно не использованные."""
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO suggestions (fingerprint, word, suggestions, used) '
+                             'VALUES (?, ?, ?, ?)',
+                             (self.fingerprint, word, json.dumps(list(suggestions), ensure_ascii=False),
+                              int(time.time())))
+            self._writes += 1
+            if self._writes % self.EVICT_EVERY == 0:
+                self.evict()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Не удалось сохранить варианты в кэш: {e}")
+
+    def evict(self) -> int:
+        """
+        Удаляет давно не использованные записи сверх max_entries (и ещё 10%, чтобы не делать этого
+        при каждой следующей записи). Записи других отпечатков словаря не обновляются и уходят первыми.
+
+        :return: Число удалённых записей.
+        """
+        conn = self._connection()
+        with conn:
+            count = conn.execute('SELECT count(*) FROM suggestions').fetchone()[0]
+            excess = count - self.max_entries
+            if excess <= 0:
+                return 0
+            excess += self.max_entries // 10
+            conn.execute('DELETE FROM suggestions WHERE (fingerprint, word) IN '
+                         '(SELECT fingerprint, word FROM suggestions ORDER BY used LIMIT ?)', (excess,))
+        logger.info(f"Из кэша вариантов вытеснено записей: {excess}")
+        return excess
+
+    def stats(self) -> dict:
+        """Счётчики этого процесса: попадания, промахи и ошибки базы."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+class CachedDictionary:
+    """
+    Обёртка над словарём spylls с кэшем результатов lookup и suggest.
+    Одни и те же опечатки и термины повторяются в параграфах и документах, а suggest
+    в spylls работает сотни миллисекунд на слово, поэтому результаты запоминаются.
+    Один объект можно разделять между сессиями Streamlit и потоками.
+
+    Поддерживает тот же интерфейс, что и Dictionary: lookup(word) и suggest(word).
+    """
+
+    def __init__(self, dictionary, lookup_size: int = 200_000, suggest_size: int = 20_000, forms=None,
+                 suggester=None, store: Optional[SuggestionStore] = None):
+        """
+        :param dictionary: Словарь spylls (Dictionary).
+        :param lookup_size: Максимальное число запомненных результатов lookup.
+        :param suggest_size: Максимальное число запомненных списков вариантов suggest.
+        :param forms: Множество словоформ (WordForms из wordforms.py): найденные в нём слова
+                      принимаются без spylls и без записи в кэш.
+        :param suggester: Источник вариантов исправления с методом suggest(word) (SymSpellIndex
+                          из symspell.py); если он ничего не нашёл, варианты подбирает spylls.
+        :param store: Постоянный кэш вариантов, общий для процессов (SuggestionStore).
+        """
+        self.dictionary = dictionary
+        self.forms = forms
+        self.suggester = suggester
+        self.store = store
+        self.form_hits = 0
+        self._lookups = LRUCache(lookup_size)
+        self._suggestions = LRUCache(suggest_size)
+
+    def lookup(self, word: str) -> bool:
+        """Есть ли слово в словаре."""
+        if self.forms is not None and self.forms.accepts(word):
+            self.form_hits += 1
+            return True
+        found = self._lookups.get(word)
+        if found is None:
+            found = bool(self.dictionary.lookup(word))
+            self._lookups.put(word, found)
+        return found
+
+    def suggest(self, word: str) -> List[str]:
+        """
+        Варианты исправления слова. Вычисляются вне блокировки: параллельные запросы
+        одного и того же слова могут посчитать его дважды, но не ждут друг друга.
+        """
+        suggestions = self._suggestions.get(word)
+        if suggestions is None and self.store is not None:
+            stored = self.store.get(word)
+            if stored is not None:
+                suggestions = tuple(stored)
+                self._suggestions.put(word, suggestions)
+        if suggestions is None:
+            suggestions = tuple(self.suggester.suggest(word)) if self.suggester is not None else ()
+            if not suggestions:
+                suggestions = tuple(self.dictionary.suggest(word))
+            self._suggestions.put(word, suggestions)
+            if self.store is not None:
+                self.store.put(word, suggestions)
+        return list(suggestions)
+
+    def clear(self):
+        """Очищает оба кэша (например, после замены словаря)."""
+        self._lookups.clear()
+        self._suggestions.clear()
+
+    def stats(self) -> dict:
+        """Счётчики кэшей lookup и suggest, постоянного кэша и число слов, принятых по множеству словоформ."""
+        stats = {'forms': self.form_hits, 'lookup': self._lookups.stats(), 'suggest': self._suggestions.stats()}
+        if self.store is not None:
+            stats['store'] = self.store.stats()
+        return stats
+
+def dictionary_fingerprint(path: str) -> str:
+    """
+    Отпечаток словаря: хэш содержимого path.aff и path.dic, версии spylls и формата снимка.
+    Снимок с другим отпечатком считается устаревшим.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{SNAPSHOT_FORMAT}:{metadata.version('spylls')}".encode())
+    for ext in ('.aff', '.dic'):
+        with open(path + ext, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def build_snapshot(path: str, snapshot_path: Optional[str] = None, dictionary=None) -> str:
+    """
+    Разбирает словарь и сохраняет его (таблицы аффиксов и индекс слов) в двоичный снимок.
+    Файл записывается во временный и затем переименовывается, поэтому параллельные
+    процессы никогда не читают недописанный снимок.
+
+    :param path: Путь к словарю без расширения.
+    :param snapshot_path: Файл снимка; по умолчанию path + '.snapshot'.
+    :param dictionary: Уже загруженный словарь (чтобы не разбирать файлы повторно).
+    :return: Путь к снимку.
+    """
+    snapshot_path = snapshot_path or path + SNAPSHOT_SUFFIX
+    if dictionary is None:
+        dictionary = Dictionary.from_files(path)
+    header = {'fingerprint': dictionary_fingerprint(path), 'source': os.path.abspath(path)}
+    tmp_path = f'{snapshot_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(dictionary, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, snapshot_path)
+    logger.info(f"Снимок словаря сохранён: {snapshot_path}")
+    return snapshot_path
+
+def _read_header(snapshot_path: str) -> dict:
+    """Заголовок снимка (отпечаток словаря) без загрузки самого словаря."""
+    with open(snapshot_path, 'rb') as f:
+        return pickle.load(f)
+
+def ensure_snapshot(path: str, snapshot_path: Optional[str] = None) -> str:
+    """
+    Собирает снимок, только если его нет или он устарел.
+    Удобно вызывать один раз перед запуском пула процессов.
+
+    :return: Путь к снимку.
+    """
+    snapshot_path = snapshot_path or path + SNAPSHOT_SUFFIX
+    try:
+        if _read_header(snapshot_path).get('fingerprint') == dictionary_fingerprint(path):
+            return snapshot_path
+    except Exception:
+        pass  # Снимка нет или он повреждён - собираем заново
+    return build_snapshot(path, snapshot_path)
+
+def load_snapshot(path: str, snapshot_path: Optional[str] = None) -> Optional[Dictionary]:
+    """
+    Загружает словарь из снимка, если снимок есть и соответствует текущим .aff и .dic.
+    Снимок - файл pickle, созданный build_snapshot; загружать можно только собственные снимки.
+
+    :return: Словарь или None, если снимка нет или он устарел.
+    """
+    snapshot_path = snapshot_path or path + SNAPSHOT_SUFFIX
+    if not os.path.exists(snapshot_path):
+        return None
+    with open(snapshot_path, 'rb') as f:
+        header = pickle.load(f)
+        if header.get('fingerprint') != dictionary_fingerprint(path):
+            logger.info(f"Снимок словаря устарел: {snapshot_path}")
+            return None
+        # Сборщик мусора на миллионах новых объектов замедляет загрузку в несколько раз
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return pickle.load(f)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+def load_dictionary_with_snapshot(path: str, snapshot_path: Optional[str] = None) -> Dictionary:
+    """
+    Загружает словарь из снимка, а если снимка нет или он устарел - разбирает .aff/.dic
+    и пересобирает снимок. Если снимок не удаётся записать (например, каталог только
+    для чтения), словарь всё равно возвращается.
+    """
+    try:
+        dictionary = load_snapshot(path, snapshot_path)
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать снимок словаря: {e}")
+        dictionary = None
+    if dictionary is not None:
+        return dictionary
+
+    dictionary = Dictionary.from_files(path)
+    try:
+        build_snapshot(path, snapshot_path, dictionary=dictionary)
+    except OSError as e:
+        logger.warning(f"Не удалось сохранить снимок словаря: {e}")
+    return dictionary
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Сборка снимка словаря hunspell для быстрой загрузки")
+    parser.add_argument('--build', metavar='PATH', required=True, help="Путь к словарю без расширения (ru_RU)")
+    parser.add_argument('--snapshot', default=None, help="Файл снимка (по умолчанию PATH.snapshot)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    snapshot_path = build_snapshot(args.build, args.snapshot)
+    print(f"Снимок: {snapshot_path} ({os.path.getsize(snapshot_path) / 1024 / 1024:.1f} МБ)")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
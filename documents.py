@@ -0,0 +1,63 @@
+# documents.py
+"""
+Снимки документов для сессии Streamlit: вместо нескольких копий дерева python-docx
+(deepcopy на каждый перезапуск скрипта) в сессии хранятся байты .docx.
+
+Рабочие копии для изменений собираются из байтов и независимы друг от друга: подсветка
+и исправления меняют не только word/document.xml, но и колонтитулы, поэтому части пакета
+между копиями не разделяются. Для отображения снимок хранит один разобранный документ,
+который разбирается один раз на снимок, а не на каждый перезапуск скрипта.
+"""
+
+from io import BytesIO
+from typing import Iterable, Optional
+
+import docx
+from docx import Document
+
+class DocumentSnapshot:
+    """
+    Неизменяемый снимок документа: байты .docx и рабочие копии по требованию.
+    """
+
+    def __init__(self, data: bytes, name: str = '', view: Optional[Document] = None):
+        """
+        :param data: Содержимое .docx.
+        :param name: Имя для журнала (например, имя загруженного файла).
+        :param view: Уже разобранный документ с тем же содержимым (см. view()).
+        """
+        self.data = data
+        self.name = name
+        self._view = view
+
+    @classmethod
+    def from_document(cls, doc: Document, name: str = '', keep: bool = False) -> 'DocumentSnapshot':
+        """
+        Снимок текущего состояния документа (документ сохраняется в память).
+
+        :param keep: Оставить doc разобранным документом снимка для view(); после этого doc не изменяют.
+        """
+        f = BytesIO()
+        doc.save(f)
+        return cls(f.getvalue(), name, doc if keep else None)
+
+    def document(self) -> Document:
+        """Новая рабочая копия документа; изменения копии не затрагивают снимок и другие копии."""
+        return docx.Document(BytesIO(self.data))
+
+    def view(self) -> Document:
+        """
+        Разобранный документ только для чтения (например, для отображения): разбирается
+        при первом обращении и хранится вместе со снимком. Для изменений - document().
+        """
+        if self._view is None:
+            self._view = self.document()
+        return self._view
+
+    def memory_bytes(self) -> int:
+        """Память, занятая байтами снимка (разобранный документ view() не учитывается)."""
+        return len(self.data)
+
+def snapshots_memory(values: Iterable) -> int:
+    """Суммарная память снимков среди значений (например, st.session_state.values())."""
+    return sum(value.memory_bytes() for value in values if isinstance(value, DocumentSnapshot))
@@ -0,0 +1,252 @@
+# engine.py
+
+import time
+import logging
+from typing import Tuple, List, Optional
+from docx import Document
+from docx.oxml import parse_xml
+from lxml import etree
+
+from blocks import get_blocks, BODY_KINDS
+from taskes import iter_doc_paragraphs
+from utiles import paragraph_runs
+from rules import (
+    compile_rule_set, apply_rule_set_to_run, apply_rule_set_to_paragraph, detect_in_text, new_format_stats,
+)
+
+logger = logging.getLogger(__name__)
+
+FORMAT_MODES = ('run', 'paragraph')
+
+def _paragraphs_xml(paragraphs) -> List[bytes]:
+    """XML параграфов блока (включая форматирование runs)."""
+    return [etree.tostring(para._p) for para in paragraphs]
+
+def _restore_paragraphs(paragraphs, xml: List[bytes]):
+    """
+    Заменяет содержимое параграфов сохранённым XML на месте: элементы w:p остаются теми же,
+    поэтому объекты Paragraph и кэш блоков (get_blocks) остаются действительными.
+    """
+    for para, para_xml in zip(paragraphs, xml):
+        source = parse_xml(para_xml)
+        para._p.attrib.clear()
+        para._p.attrib.update(source.attrib)
+        para._p[:] = list(source)
+
+def format_paragraph(para, rule_set: dict, mode: str, stats: Optional[dict] = None):
+    """Применяет набор правил к одному параграфу в режиме 'run' или 'paragraph'."""
+    if mode == 'paragraph':
+        apply_rule_set_to_paragraph(para, rule_set, stats)
+        return
+    if stats is not None:
+        stats['paragraphs'] += 1
+    for run in paragraph_runs(para):
+        apply_rule_set_to_run(run, rule_set, stats)
+
+def stats_rows(stats: dict) -> List[dict]:
+    """
+    Статистика форматирования в виде строк таблицы (для лога, DataFrame или JSON),
+    задачи отсортированы по убыванию времени.
+    """
+    rows = [{
+        'Задача': desc,
+        'Время, с': round(counters['seconds'], 4),
+        'Параграфов': counters['paragraphs'],
+        'Runs': counters['runs'],
+        'Изменено runs': counters['runs_changed'],
+        'Вызовов regex': counters['regex_calls'],
+    } for desc, counters in stats['tasks'].items()]
+    return sorted(rows, key=lambda row: row['Время, с'], reverse=True)
+
+def _finish_stats(stats: Optional[dict], started: float):
+    """Дописывает общее время прохода и объём обхода по каждой задаче, логирует статистику."""
+    if stats is None:
+        return
+    stats['seconds'] = time.perf_counter() - started
+    for counters in stats['tasks'].values():
+        counters['paragraphs'] = stats['paragraphs']
+        counters['runs'] = stats['runs']
+    logger.info(f"Статистика форматирования ({stats['mode']}): {stats['seconds']:.3f} с, "
+                f"параграфов {stats['paragraphs']}, runs {stats['runs']}")
+    for row in stats_rows(stats):
+        logger.debug(f"  {row}")
+
+def apply_formats_single_pass(doc: Document, selected_tasks: List[str], mode: str = 'run',
+                              state: Optional[dict] = None, stats: Optional[dict] = None) -> Tuple[Document, List[str]]:
+    """
+    Применяет выбранные форматирующие задачи за один обход документа.
+
+    В режиме 'run' каждый run обрабатывается всеми выбранными правилами в порядке
+    selected_tasks, поэтому результат совпадает с последовательным вызовом задач.
+    В режиме 'paragraph' правила применяются к тексту параграфа целиком и находят
+    совпадения, разбитые на несколько runs; правки записываются в затронутые runs.
+
+    Если передан state, в нём запоминается результат форматирования каждого блока (параграфа
+    или ячейки таблицы): хэш XML параграфов блока до правил -> их XML после правил.
+    При следующем вызове с тем же state блок, содержимое которого уже встречалось, не
+    форматируется: его параграфы заменяются сохранённым результатом, а уже отформатированный
+    блок оставляется как есть. Поэтому после исправления нескольких слов в новой копии
+    документа правила применяются только к изменённым блокам. При смене набора правил
+    или режима состояние сбрасывается; после прохода в нём остаются только блоки этого прохода.
+
+    :param doc: Объект документа.
+    :param selected_tasks: Описания задач (ключи task2func).
+    :param mode: Режим применения: 'run' или 'paragraph'.
+    :param state: Словарь состояния между проходами (например, из st.session_state).
+    :param stats: Если передан словарь, он заполняется статистикой прохода (см. rules.new_format_stats):
+                  время, обойденные параграфы и runs, изменённые runs и вызовы regex по каждой задаче.
+    :return: Кортеж (обновлённый документ, история изменений).
+    """
+    if mode not in FORMAT_MODES:
+        raise ValueError(f"Неизвестный режим форматирования: '{mode}'")
+
+    rule_set = compile_rule_set(tuple(selected_tasks))
+    for desc in rule_set['missing']:
+        logger.warning(f"Форматирующая задача с описанием '{desc}' не найдена.")
+    history = [rule['history'] for rule in rule_set['rules']]
+    if stats is not None:
+        stats.clear()
+        stats.update(new_format_stats(rule_set, mode))
+    if not rule_set['rules']:
+        return doc, history
+
+    started = time.perf_counter()
+    if state is None:
+        for para in iter_doc_paragraphs(doc):
+            format_paragraph(para, rule_set, mode, stats)
+        _finish_stats(stats, started)
+        logger.info(f"Однопроходное форматирование выполнено: {history}")
+        return doc, history
+
+    rules_key = (mode, tuple(selected_tasks))
+    if state.get('rules_key') != rules_key:
+        state['rules_key'] = rules_key
+        state['blocks'] = {}
+        state['formatted'] = set()
+    results = state['blocks']
+    formatted = state['formatted']
+    pass_results = {}
+    pass_formatted = set()
+    processed = 0
+    skipped = 0
+    for block in get_blocks(doc, BODY_KINDS):
+        paragraphs = block['paragraphs']
+        before = _paragraphs_xml(paragraphs)
+        key = hash(b''.join(before))
+        if key in formatted:  # Блок уже отформатирован этими правилами
+            pass_formatted.add(key)
+            skipped += 1
+            continue
+        after = results.get(key)
+        if after is not None:
+            if after != before:
+                _restore_paragraphs(paragraphs, after)
+            skipped += 1
+        else:
+            for para in paragraphs:
+                format_paragraph(para, rule_set, mode, stats)
+            after = _paragraphs_xml(paragraphs)
+            processed += 1
+        pass_results[key] = after
+        pass_formatted.add(hash(b''.join(after)))
+    state['blocks'] = pass_results
+    state['formatted'] = pass_formatted
+
+    if stats is not None:
+        stats['blocks_processed'] = processed
+        stats['blocks_skipped'] = skipped
+    _finish_stats(stats, started)
+    logger.info(f"Однопроходное форматирование выполнено: {history}; "
+                f"обработано блоков: {processed}, без изменений: {skipped}")
+    return doc, history
+
+def document_text(doc: Document) -> str:
+    """
+    Текст документа в координатах спанов detect_format_spans:
+    тексты runs параграфов основного текста и ячеек таблиц в порядке документа (включая runs
+    гиперссылок, см. utiles.paragraph_runs), разделённые переводом строки.
+    """
+    return '\n'.join(''.join(run.text for run in paragraph_runs(para)) for para in iter_doc_paragraphs(doc))
+
+def _detect_paragraph(para, rule_set: dict, mode: str) -> Tuple[str, str, List[dict], List[Tuple[int, int]]]:
+    """
+    Находит правки в одном параграфе без изменения runs.
+
+    :return: Кортеж (текст параграфа, текст после правил, правки, спаны исправлений в тексте после правил).
+    """
+    format_rules = [rule for rule in rule_set['rules'] if rule['fix_run'] is not None]
+    runs = paragraph_runs(para)  # Те же координаты, что у para.text и replace_spans
+    texts = [run.text for run in runs]
+    found = []
+    fix_spans = []
+
+    if mode == 'paragraph':
+        new_text, found, fix_spans = detect_in_text(''.join(texts), rule_set)
+    else:
+        pieces = []
+        offset = 0
+        new_offset = 0
+        for run_text in texts:
+            new_run_text, run_found, run_fix_spans = detect_in_text(run_text, rule_set)
+            for item in run_found:
+                item['offset'] += offset
+            found.extend(run_found)
+            fix_spans.extend((new_offset + start, new_offset + end) for start, end in run_fix_spans)
+            pieces.append(new_run_text)
+            offset += len(run_text)
+            new_offset += len(new_run_text)
+        new_text = ''.join(pieces)
+
+    # Правила форматирования (курсив) не меняют текст: спаном служит весь run
+    if format_rules:
+        offset = 0
+        for run, run_text in zip(runs, texts):
+            if run.italic and run_text:
+                for rule in format_rules:
+                    found.append({'rule': rule['name'], 'offset': offset, 'length': len(run_text), 'replacement': run_text})
+            offset += len(run_text)
+        found.sort(key=lambda item: item['offset'])
+    return ''.join(texts), new_text, found, fix_spans
+
+def detect_format_spans(doc: Document, selected_tasks: List[str], mode: str = 'run') -> Tuple[List[str], List[dict], List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """
+    Режим только для анализа: находит, что изменили бы выбранные правила, не трогая документ.
+
+    Каждая правка описывается словарём:
+    'block' - номер параграфа в порядке iter_doc_paragraphs, 'offset' и 'length' - положение
+    в исходном тексте параграфа, 'replacement' - предлагаемый текст, 'rule' - описание задачи,
+    'start'/'end' - спан в document_text(doc).
+
+    :param doc: Объект документа (не изменяется).
+    :param selected_tasks: Описания задач (ключи task2func).
+    :param mode: 'run' или 'paragraph' - как при применении правил.
+    :return: Кортеж (история, правки, error_spans в исходном тексте документа,
+             fix_spans в тексте документа после правил).
+    """
+    if mode not in FORMAT_MODES:
+        raise ValueError(f"Неизвестный режим форматирования: '{mode}'")
+    rule_set = compile_rule_set(tuple(selected_tasks))
+    for desc in rule_set['missing']:
+        logger.warning(f"Форматирующая задача с описанием '{desc}' не найдена.")
+    history = [rule['history'] for rule in rule_set['rules']]
+
+    found = []
+    error_spans = []
+    fix_spans = []
+    block_start = 0
+    new_block_start = 0
+    if rule_set['rules']:
+        for block, para in enumerate(iter_doc_paragraphs(doc)):
+            text, new_text, para_found, para_fix_spans = _detect_paragraph(para, rule_set, mode)
+            for item in para_found:
+                item['block'] = block
+                item['start'] = block_start + item['offset']
+                item['end'] = item['start'] + item['length']
+                error_spans.append((item['start'], item['end']))
+            found.extend(para_found)
+            fix_spans.extend((new_block_start + start, new_block_start + end) for start, end in para_fix_spans)
+            block_start += len(text) + 1
+            new_block_start += len(new_text) + 1
+
+    logger.info(f"Анализ форматирования: найдено правок {len(found)}")
+    return history, found, error_spans, fix_spans
@@ -0,0 +1,444 @@
+# rules.py
+
+import re
+import time
+import logging
+from bisect import bisect_right
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+from docx.enum.text import WD_COLOR_INDEX  # Для подсветки
+
+from utiles import paragraph_runs
+
+logger = logging.getLogger(__name__)
+
+# Реестр правил форматирования: описание задачи (ключ task2func) -> правило.
+RULES: Dict[str, dict] = {}
+
+def _compile_template(template: str, group_offset: int) -> Callable:
+    """
+    Разбирает шаблон замены (с обратными ссылками вида \\1) один раз
+    и возвращает функцию, собирающую замену по совпадению объединённого выражения.
+    """
+    pieces = []
+    for i, part in enumerate(re.split(r'\\(\d+)', template)):
+        if i % 2:
+            pieces.append(int(part) + group_offset)
+        elif part:
+            pieces.append(part)
+    if all(isinstance(piece, str) for piece in pieces):
+        constant = ''.join(pieces)
+        return lambda m: constant
+    return lambda m: ''.join(piece if isinstance(piece, str) else (m.group(piece) or '') for piece in pieces)
+
+def _compile_patterns(patterns: List[Tuple[str, str]]) -> Tuple[re.Pattern, Callable]:
+    """
+    Объединяет шаблоны правила в одно выражение-альтернативу.
+    Каждая альтернатива заключена в именованную группу, по которой замена выбирает свой шаблон.
+    """
+    alternatives = []
+    templates = {}
+    group_offset = 0
+    for i, (pattern, replace_with) in enumerate(patterns):
+        name = f'_r{i}'
+        group_offset += 1  # Внешняя группа альтернативы
+        alternatives.append(f'(?P<{name}>{pattern})')
+        templates[name] = _compile_template(replace_with, group_offset)
+        group_offset += re.compile(pattern).groups
+
+    def replace(m):
+        return templates[m.lastgroup](m)
+
+    return re.compile('|'.join(alternatives)), replace
+
+def register_rule(name: str, task: str, history: str,
+                  patterns: Optional[List[Tuple[str, str]]] = None,
+                  fix_run: Optional[Callable] = None,
+                  merge: bool = True) -> dict:
+    """
+    Регистрирует правило форматирования под описанием задачи из task2func.
+
+    :param name: Описание задачи (ключ task2func).
+    :param task: Короткое имя задачи для журнала (например, 'task10').
+    :param history: Запись в истории изменений.
+    :param patterns: Список (шаблон, замена).
+    :param fix_run: Обработчик run для правил, не меняющих текст (например, курсив).
+    :param merge: Объединять ли шаблоны в одну альтернативу. Отключается, если результат
+                  последовательных замен зависит от предыдущих (замена создаёт текст для следующей).
+    :return: Зарегистрированное правило.
+    """
+    rule = {
+        'name': name,
+        'task': task,
+        'history': history,
+        'patterns': patterns or [],
+        'steps': [],
+        'fix_run': fix_run,
+    }
+    if patterns and merge:
+        rule['steps'] = [_compile_patterns(patterns)]
+    elif patterns:
+        rule['steps'] = [_compile_patterns([pattern]) for pattern in patterns]
+    RULES[name] = rule
+    return rule
+
+def _fix_italic(run) -> bool:
+    """Убирает курсив у run."""
+    if run.italic:
+        run.italic = False
+        run.font.highlight_color = WD_COLOR_INDEX.BLUE  # Установка подсветки
+        logger.debug(f"task3 изменено: '{run.text}'")
+        return True
+    return False
+
+ITALIC = register_rule(
+    '3. Курсив в докладной записке не используется',
+    task='task3',
+    history="3. Курсив в докладной записке не используется",
+    fix_run=_fix_italic,
+)
+
+DOCUMENT_NUMBERS = register_rule(
+    '10. При указании номера документа или его пункта пробел не ставится',
+    task='task10',
+    history="10. При указании номера документа или его пункта пробел не ставится",
+    patterns=[
+        (r"(п\.)\s*(\d[\d.]*)", r"\1\2"),  # п.1.2.3
+        (r"(пп\.)\s*(\d[\d.]*)\s*-\s*(\d[\d.]*)", r"\1\2-\3"),  # пп.1.2.3-1.2.5
+        (r"№\s*(\d+)", r"№\1"),  # № 3 -> №3
+    ],
+)
+
+QUOTES = register_rule(
+    '12. Формат кавычек - «...»',
+    task='task12',
+    history="12. Формат кавычек - «...»",
+    patterns=[(r'"(.*?)"', r'«\1»')],
+)
+
+ABBREVIATIONS = register_rule(
+    '13. Форматирование сокращений: "млн" и "млрд" без точек, "тыс." и "руб." с точками',
+    task='task13',
+    history="13. Форматирование сокращений: 'млн' и 'млрд' без точек, 'тыс.' и 'руб.' с точками",
+    patterns=[
+        (r'\b(млн|млрд)\b\.?', r'\1'),  # Убираем точки
+        (r'\bтыс\b', 'тыс.'),           # Добавляем точку
+        (r'\bруб\b', 'руб.'),           # Добавляем точку
+    ],
+    merge=False,  # 'млрд.руб' -> 'млрдруб': после первой замены 'руб' уже не отдельное слово
+)
+
+SLASH = register_rule(
+    '14. Пробелы вокруг знака "/" удалены',
+    task='task14',
+    history="14. Пробелы вокруг знака '/' удалены",
+    patterns=[(r'\s*/\s*', '/')],
+)
+
+PERCENT = register_rule(
+    '15. Удаление пробела перед знаком "%"',
+    task='task15',
+    history="15. Удаление пробела перед знаком '%'",
+    # Одна альтернатива вместо двух последовательных замен '\s+%' и '%\s+'
+    patterns=[(r'\s+%\s*|%\s+', '%')],
+)
+
+DASHES = register_rule(
+    '19. Правильное использование тире и дефисов',
+    task='task19',
+    history="19. Правильное использование тире и дефисов",
+    patterns=[
+        (r'\s*—\s*', ' — '),            # Тире с пробелами
+        (r'(?<!\s)-(?!=\s)', '-'),      # Дефис без пробелов
+    ],
+)
+
+IDENTIFIED = register_rule(
+    '23. Вместо слова \'Выявлено\' использовать \'Установлено\'',
+    task='task23',
+    history="23. Вместо слова 'Выявлено' использовать 'Установлено'",
+    patterns=[(re.escape('Выявлено'), 'Установлено')],
+)
+
+EMPLOYEE = register_rule(
+    '24. Вместо слова \'Сотрудник\' использовать \'Работник\'',
+    task='task24',
+    history="24. Вместо слова 'Сотрудник' использовать 'Работник'",
+    patterns=[(re.escape('Сотрудник'), 'Работник')],
+)
+
+MULTIPLE_SPACES = register_rule(
+    '25. Удаление множественных пробелов',
+    task='task25',
+    history="25. Удаление множественных пробелов",
+    patterns=[(r' {2,}', ' ')],
+)
+
+def apply_rule_to_run(run, rule: dict) -> bool:
+    """
+    Применяет одно правило к run. Возвращает True, если run изменён.
+    """
+    if rule['fix_run'] is not None:
+        return rule['fix_run'](run)
+
+    original_text = run.text
+    new_text = original_text
+    for regex, replace in rule['steps']:
+        new_text = regex.sub(replace, new_text)
+    if original_text != new_text:
+        run.text = new_text
+        run.font.highlight_color = WD_COLOR_INDEX.BLUE
+        logger.debug(f"{rule['task']} изменено: '{original_text}' -> '{new_text}'")
+        return True
+    return False
+
+@lru_cache(maxsize=64)
+def compile_rule_set(names: Tuple[str, ...]) -> dict:
+    """
+    Собирает набор правил по описаниям задач.
+    Все текстовые шаблоны набора объединяются в одно выражение-триггер:
+    run, в котором триггер ничего не нашёл, не изменится ни одним правилом.
+
+    :param names: Описания задач (ключи task2func) в порядке применения.
+    :return: Словарь с ключами 'rules', 'missing' и 'trigger'.
+    """
+    rules = [RULES[name] for name in names if name in RULES]
+    missing = [name for name in names if name not in RULES]
+    # Именованные группы разных правил совпадают по именам, поэтому в триггере они становятся обычными
+    text_patterns = [re.sub(r'\(\?P<_r\d+>', '(?:', regex.pattern)
+                     for rule in rules for regex, _ in rule['steps']]
+    trigger = None
+    if text_patterns:
+        trigger = re.compile('|'.join(f'(?:{pattern})' for pattern in text_patterns))
+    return {'rules': rules, 'missing': missing, 'trigger': trigger}
+
+def new_task_stats() -> dict:
+    """Счётчики работы одной задачи: время, обойденные параграфы и runs, изменённые runs, вызовы regex."""
+    return {'seconds': 0.0, 'paragraphs': 0, 'runs': 0, 'runs_changed': 0, 'regex_calls': 0}
+
+def new_format_stats(rule_set: dict, mode: str) -> dict:
+    """
+    Статистика прохода форматирования по набору правил.
+    'tasks' - счётчики по каждой задаче (описание задачи -> new_task_stats()),
+    'trigger_calls' - поиски по объединённому триггеру набора.
+    """
+    return {
+        'mode': mode,
+        'seconds': 0.0,
+        'paragraphs': 0,
+        'runs': 0,
+        'trigger_calls': 0,
+        'tasks': {rule['name']: new_task_stats() for rule in rule_set['rules']},
+    }
+
+def apply_rule_set_to_run(run, rule_set: dict, stats: Optional[dict] = None) -> List[dict]:
+    """
+    Применяет набор правил к run в заданном порядке.
+    Сначала выполняется один поиск по объединённому триггеру; если он ничего не нашёл,
+    текстовые правила пропускаются.
+
+    :param stats: Статистика из new_format_stats; если передана, в неё добавляются
+                  время и счётчики каждого правила.
+    :return: Список правил, изменивших run.
+    """
+    changed = []
+    text_matched = rule_set['trigger'] is not None and rule_set['trigger'].search(run.text) is not None
+    if stats is not None:
+        stats['runs'] += 1
+        stats['trigger_calls'] += rule_set['trigger'] is not None
+    for rule in rule_set['rules']:
+        if rule['fix_run'] is None and not text_matched:
+            continue
+        if stats is None:
+            if apply_rule_to_run(run, rule):
+                changed.append(rule)
+            continue
+        counters = stats['tasks'][rule['name']]
+        started = time.perf_counter()
+        run_changed = apply_rule_to_run(run, rule)
+        counters['seconds'] += time.perf_counter() - started
+        if rule['fix_run'] is None:
+            counters['regex_calls'] += len(rule['steps'])
+        if run_changed:
+            counters['runs_changed'] += 1
+            changed.append(rule)
+    return changed
+
+def _split_edit(start: int, old: str, new: str) -> List[Tuple[int, int, str]]:
+    """
+    Разбивает замену совпадения на минимальные правки (начало, конец, новый текст),
+    чтобы неизменённые символы остались в своих runs с их форматированием.
+    """
+    edits = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        if tag != 'equal':
+            edits.append((start + i1, start + i2, new[j1:j2]))
+    return edits
+
+def _write_edits(texts: List[str], starts: List[int], edits: List[Tuple[int, int, str]]) -> set:
+    """
+    Переносит правки, заданные в координатах текста параграфа, в тексты runs.
+    Новый текст попадает в run, где начинается правка; удаляемые символы
+    вырезаются из всех затронутых runs. Правки применяются с конца, поэтому
+    смещения из карты starts для предыдущих правок остаются верными.
+
+    :return: Индексы изменённых runs.
+    """
+    changed = set()
+    for start, end, new_text in reversed(edits):
+        first = max(bisect_right(starts, start) - 1, 0)
+        offset = start - starts[first]
+        tail = texts[first][end - starts[first]:] if end - starts[first] <= len(texts[first]) else ''
+        texts[first] = texts[first][:offset] + new_text + tail
+        changed.add(first)
+        i = first + 1
+        while i < len(texts) and starts[i] < end:
+            if texts[i]:
+                texts[i] = texts[i][end - starts[i]:]
+                changed.add(i)
+            i += 1
+    return changed
+
+def apply_rule_set_to_paragraph(para, rule_set: dict, stats: Optional[dict] = None) -> List[dict]:
+    """
+    Применяет набор правил к параграфу целиком.
+    Текст параграфа собирается один раз вместе с картой начал runs; каждое правило
+    выполняет один проход по всему тексту, а правки записываются только в затронутые runs.
+    Так находятся совпадения, разбитые Word на несколько runs (например, 'п.' | ' 1.2').
+
+    :param stats: Статистика из new_format_stats (см. apply_rule_set_to_run).
+    :return: Список правил, изменивших параграф.
+    """
+    runs = paragraph_runs(para)
+    changed_rules = []
+    if stats is not None:
+        stats['paragraphs'] += 1
+        stats['runs'] += len(runs)
+    if not runs:
+        return changed_rules
+    for rule in rule_set['rules']:
+        if rule['fix_run'] is None:
+            continue
+        started = time.perf_counter()
+        fixed = sum([rule['fix_run'](run) for run in runs])
+        if stats is not None:
+            counters = stats['tasks'][rule['name']]
+            counters['seconds'] += time.perf_counter() - started
+            counters['runs_changed'] += fixed
+        if fixed:
+            changed_rules.append(rule)
+
+    texts = [run.text for run in runs]
+    text = ''.join(texts)
+    if stats is not None:
+        stats['trigger_calls'] += rule_set['trigger'] is not None
+    if rule_set['trigger'] is None or rule_set['trigger'].search(text) is None:
+        return changed_rules
+
+    changed_runs = set()
+    for rule in rule_set['rules']:
+        started = time.perf_counter()
+        rule_runs = set()
+        for regex, replace in rule['steps']:
+            starts = []
+            position = 0
+            for run_text in texts:
+                starts.append(position)
+                position += len(run_text)
+            edits = []
+            for m in regex.finditer(text):
+                new_text = replace(m)
+                if new_text == m.group():
+                    continue
+                first = bisect_right(starts, m.start()) - 1
+                if m.end() <= starts[first] + len(texts[first]):
+                    edits.append((m.start(), m.end(), new_text))
+                else:
+                    edits.extend(_split_edit(m.start(), m.group(), new_text))
+            if edits:
+                rule_runs |= _write_edits(texts, starts, edits)
+                text = ''.join(texts)
+        if stats is not None:
+            counters = stats['tasks'][rule['name']]
+            counters['seconds'] += time.perf_counter() - started
+            counters['regex_calls'] += len(rule['steps'])
+            counters['runs_changed'] += len(rule_runs)
+        if rule_runs:
+            changed_runs |= rule_runs
+            changed_rules.append(rule)
+
+    for i in sorted(changed_runs):
+        if runs[i].text != texts[i]:
+            logger.debug(f"Параграф изменён: '{runs[i].text}' -> '{texts[i]}'")
+            runs[i].text = texts[i]
+            runs[i].font.highlight_color = WD_COLOR_INDEX.BLUE
+    return changed_rules
+
+def _shift_position(position: int, edits: List[Tuple[int, int, int]], at_end: bool) -> int:
+    """
+    Переводит позицию текста до замен в позицию после замен.
+    edits - список (начало, конец, длина замены) в координатах текста до замен.
+    Позиция внутри заменённого участка прижимается к началу или концу замены.
+    """
+    shift = 0
+    for start, end, length in edits:
+        if end <= position and not (start == end == position and not at_end):
+            shift += length - (end - start)
+        elif start < position < end or (start == position == end and at_end):
+            return start + shift + (length if at_end else 0)
+        elif start >= position:
+            break
+    return position + shift
+
+def detect_in_text(text: str, rule_set: dict) -> Tuple[str, List[dict], List[Tuple[int, int]]]:
+    """
+    Находит правки текстовых правил набора, не изменяя документ.
+    Правила применяются последовательно к копии текста; позиции каждой правки
+    переводятся обратно в координаты исходного текста.
+
+    :param text: Исходный текст (run или параграфа).
+    :param rule_set: Набор правил из compile_rule_set.
+    :return: Кортеж (текст после правил, правки, спаны исправлений в тексте после правил).
+             Правка - словарь с ключами 'rule', 'offset', 'length', 'replacement'.
+    """
+    if rule_set['trigger'] is None or rule_set['trigger'].search(text) is None:
+        return text, [], []
+
+    current = text
+    origin = list(range(len(text) + 1))  # Позиция символа текущего текста в исходном тексте
+    found = []
+    fix_spans = []
+    for rule in rule_set['rules']:
+        for regex, replace in rule['steps']:
+            pieces = []
+            new_origin = []
+            edits = []
+            last = 0
+            for m in regex.finditer(current):
+                new_text = replace(m)
+                if new_text == m.group():
+                    continue
+                found.append({
+                    'rule': rule['name'],
+                    'offset': origin[m.start()],
+                    'length': origin[m.end()] - origin[m.start()],
+                    'replacement': new_text,
+                })
+                pieces.append(current[last:m.start()])
+                new_origin.extend(origin[last:m.start()])
+                pieces.append(new_text)
+                new_origin.extend([origin[m.start()]] * len(new_text))
+                edits.append((m.start(), m.end(), len(new_text)))
+                last = m.end()
+            if not edits:
+                continue
+            pieces.append(current[last:])
+            new_origin.extend(origin[last:])
+            fix_spans = [(_shift_position(start, edits, False), _shift_position(end, edits, True))
+                         for start, end in fix_spans]
+            fix_spans.extend((_shift_position(start, edits, False), _shift_position(end, edits, True))
+                             for start, end, _ in edits)
+            current = ''.join(pieces)
+            origin = new_origin
+    return current, found, fix_spans
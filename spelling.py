@@ -0,0 +1,544 @@
+# spelling.py
+
+import re
+import os
+import sqlite3
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from docx.oxml.ns import qn
+from spylls.hunspell import Dictionary
+
+from allowlist import Allowlist
+from blocks import get_blocks, blocks_to_html
+from utiles import paragraph_runs, replace_spans, shading
+from dictionaries import (
+    CachedDictionary, SuggestionStore, dictionary_fingerprint, ensure_snapshot, load_dictionary_with_snapshot,
+)
+from symspell import load_symspell
+from wordforms import load_word_forms
+
+logger = logging.getLogger(__name__)
+
+DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ru_RU')
+SUGGESTIONS_SUFFIX = '.suggestions.sqlite'
+
+# Слово не из словаря, варианты исправления которого ещё не подобраны (см. ensure_suggestions)
+PENDING = object()
+
+def load_dictionary_files(path: str = DICTIONARY_PATH, use_snapshot: bool = True) -> Dictionary:
+    """
+    Загружает словарь hunspell (path.aff и path.dic).
+
+    :param use_snapshot: Загружать из двоичного снимка path.snapshot, если он соответствует
+                         .aff и .dic (иначе снимок пересобирается), см. dictionaries.py.
+    """
+    if use_snapshot:
+        return load_dictionary_with_snapshot(path)
+    return Dictionary.from_files(path)
+
+def open_suggestion_store(path: str = DICTIONARY_PATH, engine: str = 'spylls',
+                          store_path: Optional[str] = None) -> Optional[SuggestionStore]:
+    """
+    Открывает постоянный кэш вариантов исправления (по умолчанию path + '.suggestions.sqlite').
+    Варианты разных движков подбора (spylls, symspell) хранятся раздельно.
+
+    :return: Кэш или None, если базу нельзя открыть (например, каталог только для чтения).
+    """
+    store_path = store_path or path + SUGGESTIONS_SUFFIX
+    try:
+        return SuggestionStore(store_path, f"{dictionary_fingerprint(path)}:{engine}")
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Постоянный кэш вариантов недоступен: {e}")
+        return None
+
+def load_spell_checker(path: str = DICTIONARY_PATH, store_path: Optional[str] = None) -> CachedDictionary:
+    """
+    Словарь для проверки орфографии: spylls из снимка, множество словоформ для правильных слов,
+    индекс SymSpell для вариантов исправления (если собран, см. symspell.py), кэши lookup/suggest
+    и постоянный кэш вариантов, общий для процессов и перезапусков.
+    """
+    dictionary = load_dictionary_files(path)
+    suggester = load_symspell(path)
+    store = open_suggestion_store(path, 'symspell' if suggester is not None else 'spylls', store_path)
+    return CachedDictionary(dictionary, forms=load_word_forms(path, dictionary=dictionary),
+                            suggester=suggester, store=store)
+
+def load_lookup_checker(path: str = DICTIONARY_PATH) -> CachedDictionary:
+    """
+    Словарь только для lookup: spylls из снимка и множество словоформ, без индекса SymSpell
+    и постоянного кэша вариантов. Используется процессами пула проверки: варианты исправления
+    подбираются в основном процессе, и загружать индекс в каждый процесс не нужно.
+    """
+    dictionary = load_dictionary_files(path)
+    return CachedDictionary(dictionary, forms=load_word_forms(path, dictionary=dictionary))
+
+def match_case(original, corrected):
+    """Сохраняет регистр исправленного слова в соответствии с оригинальным словом."""
+    if original.isupper():
+        return corrected.upper()
+    elif original[0].isupper():
+        return corrected.capitalize()
+    else:
+        return corrected
+
+def suggest_word(word: str, dictionary) -> List[str]:
+    """Варианты исправления слова с регистром как у исходного слова."""
+    return [match_case(word, sug) for sug in dictionary.suggest(word)]
+
+# Слово из двух и более символов \w и его класс. Альтернативы проверяются по порядку, и каждая
+# должна занять слово целиком (\b с обеих сторон), поэтому границы слов те же, что у \b\w{2,}\b
+TOKEN_PATTERN = re.compile(r"""
+    \b(?=\w{2})(?:                                        # Не короче двух символов
+        (?P<abbreviation>[A-ZА-ЯЁ]{2,})                   # Аббревиатура: только заглавные буквы
+      | (?P<number>[\d_]{2,})                             # Число (в том числе 10_000)
+      | (?P<latin>[A-Za-z0-9_]*[A-Za-z][A-Za-z0-9_]*)     # Латиница, возможно с цифрами
+      | (?P<cyrillic>[А-Яа-яЁё]{2,})                      # Кириллица
+      | (?P<other>\w{2,})                                 # Смешанные слова (5го, abc1д)
+    )\b
+""", re.VERBOSE)
+
+# Классы слов, которые не проверяются по словарю
+SKIPPED_KINDS = ('abbreviation', 'number')
+
+class Token(NamedTuple):
+    """Слово текста: сам текст, смещения начала и конца в тексте и класс (см. TOKEN_PATTERN)."""
+    text: str
+    start: int
+    end: int
+    kind: str
+
+def scan_tokens(text: str) -> List[Token]:
+    """Разбивает текст на слова за один проход: со смещениями и классом каждого слова."""
+    return [Token(match.group(), match.start(), match.end(), match.lastgroup)
+            for match in TOKEN_PATTERN.finditer(text)]
+
+def token_kind(word: str) -> str:
+    """Класс отдельного слова ('abbreviation', 'number', 'latin', 'cyrillic' или 'other')."""
+    match = TOKEN_PATTERN.fullmatch(word)
+    return match.lastgroup if match else 'other'
+
+def checked_words(tokens: Iterable[Token]) -> Iterator[str]:
+    """Слова, которые нужно проверять по словарю: всё, кроме аббревиатур и чисел."""
+    return (token.text for token in tokens if token.kind not in SKIPPED_KINDS)
+
+def tokenize(text: str) -> List[str]:
+    """Разбивает текст на слова, игнорируя знаки препинания и одиночные буквы."""
+    return [token.text for token in scan_tokens(text)]  # Минимальная длина слова - 2 символа
+
+def check_tokens(tokens: Iterable[str], dictionary, verdicts: Optional[dict] = None,
+                 progress: Optional[Callable[[int, int], None]] = None, suggest: bool = True,
+                 allowlist: Optional[Allowlist] = None) -> dict:
+    """
+    Проверяет каждое уникальное слово один раз: lookup, а для слов не из словаря - suggest.
+    Слова из списков разрешённых (allowlist) принимаются без обращения к словарю.
+
+    :param tokens: Слова для проверки, в том числе повторяющиеся (аббревиатуры и числа
+                   отбрасывает checked_words).
+    :param verdicts: Уже проверенные слова; дополняется и возвращается.
+    :param progress: Необязательная функция progress(проверено_слов, всего_слов).
+    :param suggest: Если False, варианты не подбираются (только lookup): для слов не из словаря
+                    сохраняется PENDING, варианты потом вычисляет ensure_suggestions.
+    :param allowlist: Списки разрешённых слов (allowlist.py); перечитываются, если файлы изменились.
+    :return: Словарь {слово: None, если слово в словаре, иначе список вариантов исправления или PENDING}.
+    """
+    if verdicts is None:
+        verdicts = {}
+    if allowlist is not None:
+        allowlist.refresh()
+    unique = [token for token in dict.fromkeys(tokens) if token not in verdicts]
+    for checked, token in enumerate(unique, 1):
+        if allowlist is not None and allowlist.accepts(token):
+            verdicts[token] = None
+        elif dictionary.lookup(token):
+            verdicts[token] = None
+        elif suggest:
+            verdicts[token] = suggest_word(token, dictionary)
+        else:
+            verdicts[token] = PENDING
+        if progress is not None:
+            progress(checked, len(unique))
+    return verdicts
+
+# Словарь процесса пула проверки: загружается один раз в initializer (см. create_spelling_pool)
+_worker_dictionary = None
+
+def _init_spelling_worker(dictionary_path: str):
+    """Загружает в процесс пула словарь только для lookup (load_lookup_checker)."""
+    global _worker_dictionary
+    _worker_dictionary = load_lookup_checker(dictionary_path)
+
+def _check_chunk(tokens: List[str]) -> Tuple[dict, List[str]]:
+    """
+    Проверяет часть уникальных слов в процессе пула (только lookup).
+    PENDING не переживает передачу между процессами, поэтому такие слова возвращаются отдельным списком.
+
+    :return: (вердикты без PENDING, слова с PENDING).
+    """
+    verdicts = check_tokens(tokens, _worker_dictionary, suggest=False)
+    pending = [token for token, verdict in verdicts.items() if verdict is PENDING]
+    for token in pending:
+        del verdicts[token]
+    return verdicts, pending
+
+def create_spelling_pool(workers: Optional[int] = None, dictionary_path: str = DICTIONARY_PATH) -> ProcessPoolExecutor:
+    """
+    Пул процессов для check_tokens_parallel: в каждом процессе свой словарь для lookup, загруженный один раз.
+    Снимок словаря и множество словоформ собираются заранее, чтобы процессы их только читали.
+    Процессы запускаются через spawn: fork процесса с потоками (сервер Streamlit) небезопасен.
+
+    :param workers: Число процессов; по умолчанию число ядер.
+    """
+    try:
+        ensure_snapshot(dictionary_path)
+        load_word_forms(dictionary_path)
+    except OSError as e:
+        logger.warning(f"Не удалось подготовить снимок словаря: {e}")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_spelling_worker, initargs=(dictionary_path,))
+
+def check_tokens_parallel(tokens: Iterable[str], dictionary, executor: Optional[Executor] = None,
+                          verdicts: Optional[dict] = None, progress: Optional[Callable[[int, int], None]] = None,
+                          suggest: bool = True, chunk_size: int = 500, allowlist: Optional[Allowlist] = None) -> dict:
+    """
+    То же, что check_tokens, но уникальные слова делятся на части и проверяются в пуле процессов
+    (spylls - чистый Python, и в одном процессе проверка занимает одно ядро).
+    Если пула нет или слов меньше двух частей, слова проверяются в текущем процессе словарём dictionary.
+    Процессы пула выполняют только lookup; если suggest=True, варианты для слов не из словаря
+    подбираются после этого в текущем процессе словарём dictionary (с индексом SymSpell и кэшами).
+
+    :param executor: Пул из create_spelling_pool.
+    :param chunk_size: Число слов в одной задаче пула.
+    :param allowlist: Списки разрешённых слов: такие слова отсеиваются до отправки в пул.
+    :return: Словарь {слово: None, список вариантов или PENDING}, как у check_tokens.
+    """
+    if verdicts is None:
+        verdicts = {}
+    unique = [token for token in dict.fromkeys(tokens) if token not in verdicts]
+    if executor is None or len(unique) < 2 * chunk_size:
+        return check_tokens(unique, dictionary, verdicts, progress=progress, suggest=suggest, allowlist=allowlist)
+    if allowlist is not None:
+        allowlist.refresh()
+        allowed = [token for token in unique if allowlist.accepts(token)]
+        verdicts.update(dict.fromkeys(allowed, None))
+        unique = [token for token in unique if token not in verdicts]
+
+    # Части чередуют слова, чтобы редкие (медленные в lookup spylls) слова не собирались в одной части
+    chunk_count = -(-len(unique) // chunk_size)
+    futures = [executor.submit(_check_chunk, unique[start::chunk_count]) for start in range(chunk_count)]
+    checked = 0
+    for future in as_completed(futures):
+        chunk_verdicts, pending = future.result()
+        verdicts.update(chunk_verdicts)
+        for token in pending:
+            verdicts[token] = suggest_word(token, dictionary) if suggest else PENDING
+        checked += len(chunk_verdicts) + len(pending)
+        if progress is not None:
+            progress(checked, len(unique))
+    return verdicts
+
+def _token_errors(tokens: List[Token], verdicts: dict) -> List[dict]:
+    """Ошибки для каждого вхождения слова по результатам check_tokens."""
+    errors = []
+    for idx, token in enumerate(tokens):
+        suggestions = verdicts.get(token.text)
+        if suggestions is None:
+            continue
+        errors.append({
+            'index': idx,
+            'original': token.text,
+            'start': token.start,
+            'end': token.end,
+            'kind': token.kind,
+            'suggestions': None if suggestions is PENDING else list(suggestions)
+        })
+    return errors
+
+def find_errors_in_text(text, dictionary, allowlist: Optional[Allowlist] = None):
+    """
+    Находит орфографические ошибки в тексте, игнорируя числа и аббревиатуры.
+
+    :return: (слова текста, ошибки с номером слова 'index' и смещениями 'start' и 'end' в тексте).
+    """
+    tokens = scan_tokens(text)
+    errors = _token_errors(tokens, check_tokens(checked_words(tokens), dictionary, allowlist=allowlist))
+    return [token.text for token in tokens], errors
+
+def ensure_suggestions(records: List[dict], dictionary) -> List[dict]:
+    """
+    Подбирает варианты исправления для записей, у которых их ещё нет ('suggestions' равно None),
+    по одному вызову suggest на слово, и сохраняет их в записях.
+    Вызывается для ошибок, которые пользователь видит (например, первой страницы).
+
+    :return: Те же записи.
+    """
+    computed = {}
+    for record in records:
+        if record.get('suggestions') is not None:
+            continue
+        word = record['original']
+        if word not in computed:
+            computed[word] = suggest_word(word, dictionary)
+        record['suggestions'] = list(computed[word])
+    return records
+
+def make_error_record(block: dict, para_idx: int, error: dict) -> dict:
+    """
+    Запись об ошибке в формате st.session_state.errors.
+    Блок задаётся номером 'block_id' в списке get_blocks(doc) и параграфом 'para_idx' внутри блока.
+
+    :param error: Ошибка из find_errors_in_text (index, original, start, end, kind, suggestions).
+    """
+    return {
+        'block_type': 'table' if block['kind'] == 'cell' else 'paragraph',
+        'block_id': block['id'],
+        'block_index': block['id'],
+        'label': block['label'],
+        'row': block['row'],
+        'col': block['col'],
+        'para_idx': para_idx,  # Индекс параграфа внутри блока (ячейки)
+        'index': error['index'],
+        'original': error['original'],
+        'start': error.get('start'),  # Смещения слова в тексте параграфа
+        'end': error.get('end'),
+        'kind': error.get('kind') or token_kind(error['original']),
+        'suggestions': error['suggestions'],
+        'checkbox_key': f"checkbox_{block['id']}_{para_idx}_{error['index']}_{error['original']}"
+    }
+
+def block_error_records(block: dict, dictionary, verdicts: Optional[dict] = None,
+                        allowlist: Optional[Allowlist] = None) -> List[dict]:
+    """
+    Ошибки всех параграфов блока в формате st.session_state.errors.
+
+    :param verdicts: Общие для нескольких блоков результаты check_tokens: слово,
+                     уже проверенное в другом блоке, повторно не проверяется.
+    :param allowlist: Списки разрешённых слов.
+    """
+    if verdicts is None:
+        verdicts = {}
+    records = []
+    for para_idx, para in enumerate(block['paragraphs']):
+        text = para.text
+        if not text.strip():
+            continue
+        tokens = scan_tokens(text)
+        check_tokens(checked_words(tokens), dictionary, verdicts, allowlist=allowlist)
+        records.extend(make_error_record(block, para_idx, e) for e in _token_errors(tokens, verdicts))
+    return records
+
+def find_errors_in_doc(doc, dictionary, progress: Optional[Callable[[int, int], None]] = None,
+                       suggest: bool = True, executor: Optional[Executor] = None,
+                       allowlist: Optional[Allowlist] = None) -> List[dict]:
+    """
+    Находит орфографические ошибки во всех блоках документа: параграфах, ячейках таблиц
+    (включая вложенные) и колонтитулах.
+
+    Сначала собираются слова всего документа, затем каждое уникальное слово проверяется
+    один раз, и результат переносится на все его вхождения: слово, повторённое
+    в таблице 200 раз, обходится одним вызовом lookup и suggest.
+
+    :param doc: Объект Document.
+    :param dictionary: Словарь spylls.
+    :param progress: Необязательная функция progress(проверено_слов, всего_уникальных_слов).
+    :param suggest: Если False, ошибки находятся только по lookup, а 'suggestions' у записей
+                    равно None: время до первой подсветки не зависит от медленного suggest.
+                    Варианты затем подбирает ensure_suggestions для нужных записей.
+    :param executor: Пул из create_spelling_pool: уникальные слова проверяются параллельно,
+                     записи об ошибках собираются в порядке документа и не зависят от пула.
+    :param allowlist: Списки разрешённых слов (организации и пользователя): такие слова
+                      не считаются ошибками и не проверяются по словарю.
+    :return: Список ошибок в формате st.session_state.errors.
+    """
+    paragraphs = []
+    for block in get_blocks(doc):
+        for para_idx, para in enumerate(block['paragraphs']):
+            text = para.text
+            if text.strip():
+                paragraphs.append((block, para_idx, scan_tokens(text)))
+
+    words = (word for _, _, tokens in paragraphs for word in checked_words(tokens))
+    verdicts = check_tokens_parallel(words, dictionary, executor, progress=progress, suggest=suggest,
+                                     allowlist=allowlist)
+    logger.info(f"Проверено уникальных слов: {len(verdicts)}, "
+                f"всего слов: {sum(len(tokens) for _, _, tokens in paragraphs)}")
+
+    found = []
+    for block, para_idx, tokens in paragraphs:
+        found.extend(make_error_record(block, para_idx, e) for e in _token_errors(tokens, verdicts))
+    return found
+
+def _paragraph_spans(items: List[dict], text: str, word_key: str = 'original') -> List[Tuple[dict, Tuple[int, int]]]:
+    """
+    Смещения слов записей в тексте параграфа (в порядке текста); записи, слово которых
+    не найдено на месте или перекрывается с участком левее, пропускаются.
+    Текст параграфа разбивается на слова не больше одного раза - только если у какой-то
+    записи смещения устарели.
+
+    :param word_key: Ключ записи со словом: 'original' для ошибок, 'corrected' для исправлений.
+    """
+    candidates = []
+    tokens = None
+    for record in items:
+        span = _offset_span(record, text, word_key)
+        if span is None and word_key == 'original':
+            if tokens is None:
+                tokens = scan_tokens(text)
+            span = _token_span(record, tokens)
+        if span is not None:
+            candidates.append((record, span))
+    candidates.sort(key=lambda item: item[1][0])
+
+    found = []
+    last_end = 0
+    for record, span in candidates:
+        if span[0] < last_end:  # Перекрывается с последним взятым участком
+            continue
+        found.append((record, span))
+        last_end = span[1]
+    return found
+
+def _group_by_paragraph(records: Iterable[dict]) -> dict:
+    """Записи по параграфам: {(block_id, para_idx): [записи]} в исходном порядке."""
+    grouped = {}
+    for record in records:
+        grouped.setdefault((record['block_id'], record['para_idx']), []).append(record)
+    return grouped
+
+def highlight_errors_in_doc(doc, corrections):
+    """
+    Подсвечивает все найденные ошибки в документе, не изменяя порядок текста.
+    Ошибочные слова выделяются желтым фоном.
+    Поддерживает параграфы, ячейки таблиц и колонтитулы (блоки из get_blocks).
+    Все ошибки параграфа подсвечиваются одним проходом по его runs (replace_spans).
+    """
+    blocks = get_blocks(doc)
+    # Исключаем слова на английском языке, числа и смешанные сочетания латиницы и цифр
+    errors = (correction for correction in corrections
+              if (correction.get('kind') or token_kind(correction['original'])) not in ('latin', 'number'))
+    highlight = shading("FFFF00")  # Жёлтый цвет
+    for (block_id, para_idx), items in _group_by_paragraph(errors).items():
+        para = blocks[block_id]['paragraphs'][para_idx]
+        spans = [(start, end, None, highlight) for _, (start, end) in _paragraph_spans(items, para.text)]
+        replace_spans(para, spans)
+
+    return doc
+
+def _offset_span(record: dict, text: str, word_key: str = 'original') -> Optional[Tuple[int, int]]:
+    """Смещения 'start'/'end' записи, если слово записи стоит на этом месте текста, иначе None."""
+    start, end = record.get('start'), record.get('end')
+    if start is not None and end is not None and text[start:end] == record[word_key]:
+        return start, end
+    return None
+
+def _token_span(record: dict, tokens: List[Token]) -> Optional[Tuple[int, int]]:
+    """Смещения слова по его номеру 'index' среди слов параграфа (для записей без смещений)."""
+    index = record.get('index')
+    if index is not None and index < len(tokens) and tokens[index].text == record['original']:
+        return tokens[index].start, tokens[index].end
+    return None
+
+def apply_user_selected_corrections_doc(doc, corrections, selected_corrections):
+    """
+    Применяет выбранные пользователем исправления к документу.
+    Оставляет остальные слова без изменений.
+    Поддерживает параграфы, ячейки таблиц и колонтитулы (блоки из get_blocks).
+
+    Исправления группируются по параграфам, и все исправления параграфа применяются
+    одной перезаписью его runs: время линейно по числу исправлений и параграфов.
+    Исправляется именно то вхождение слова, которое нашла проверка (по смещению).
+    Записи без вариантов исправления пропускаются и не попадают в применённые.
+    Возвращает обновленный документ и список применённых исправлений
+    (со смещениями исправленного слова 'start' и 'end' в новом тексте параграфа).
+    """
+    blocks = get_blocks(doc)
+    # Проверяем, выбрал ли пользователь это исправление; без вариантов (пустой список или None -
+    # варианты не подбирались) исправлять нечем, и запись не применяется
+    selected = (correction for correction in corrections
+                if selected_corrections.get(correction['checkbox_key'], False) and correction.get('suggestions'))
+
+    applied_corrections = []
+    highlight = shading("90EE90")  # Светло-зеленый цвет
+    for (block_id, para_idx), items in _group_by_paragraph(selected).items():
+        para = blocks[block_id]['paragraphs'][para_idx]
+        targets = _paragraph_spans(items, para.text)
+        spans = [(start, end, correction['suggestions'][0], highlight) for correction, (start, end) in targets]
+
+        shift = 0  # Сдвиг смещений из-за исправлений, применённых левее
+        for i in sorted(replace_spans(para, spans)):
+            start, end, corrected_word, _ = spans[i]
+            correction = targets[i][0]
+            applied_corrections.append({
+                'Строка': correction['label'],
+                'block_id': block_id,
+                'para_idx': para_idx,
+                'original': correction['original'],
+                'corrected': corrected_word,
+                'start': start + shift,
+                'end': start + shift + len(corrected_word),
+            })
+            shift += len(corrected_word) - (end - start)
+
+    return doc, applied_corrections
+
+def highlight_corrected_words(doc, corrections):
+    """
+    Подсвечивает все слова, которые были исправлены.
+    Исправленные слова выделяются светло-зеленым фоном.
+    Поддерживает параграфы, ячейки таблиц и колонтитулы (блоки из get_blocks).
+    Подсвечивается ровно то место, куда записано исправление (смещения 'start'/'end' записи
+    из apply_user_selected_corrections_doc), а не все вхождения слова; записи, слово которых
+    на этом месте уже не стоит, пропускаются.
+    """
+    blocks = get_blocks(doc)
+    corrected = (correction for correction in corrections
+                 if correction.get('block_id') is not None and correction.get('corrected'))
+    highlight = shading("90EE90")  # Светло-зеленый цвет
+    for (block_id, para_idx), items in _group_by_paragraph(corrected).items():
+        para = blocks[block_id]['paragraphs'][para_idx]
+        spans = [(start, end, None, highlight)
+                 for _, (start, end) in _paragraph_spans(items, para.text, word_key='corrected')]
+        replace_spans(para, spans)
+    return doc
+
+def runs_to_html(para, highlight_errors=True, highlight_corrections=False):
+    """HTML одного параграфа с подсветкой ошибок (жёлтый) и исправлений (светло-зелёный)."""
+    paragraph_html = ''
+    for run in paragraph_runs(para):
+        run_text = run.text.replace('\n', '<br>')
+        # Проверка на подсветку ошибок
+        shd_elements = run._element.xpath('.//w:shd')
+        if shd_elements:
+            fill = shd_elements[0].get(qn('w:fill'))
+            if fill == "FFFF00" and highlight_errors:
+                # Жёлтая подсветка для ошибок
+                paragraph_html += f'<span style="background-color: #FFFF00">{run_text}</span>'
+            elif fill == "90EE90" and highlight_corrections:
+                # Светло-зелёная подсветка для исправлений
+                paragraph_html += f'<span style="background-color: #90EE90">{run_text}</span>'
+            else:
+                paragraph_html += run_text
+        else:
+            paragraph_html += run_text
+    return f'<p>{paragraph_html}</p>'
+
+def convert_docx_to_html(doc, highlight_errors=True, highlight_corrections=False):
+    """
+    Конвертирует документ docx в HTML с подсветкой ошибок и исправлений.
+    
+    :param doc: объект Document из python-docx
+    :param highlight_errors: если True, подсвечиваются ошибочные слова
+    :param highlight_corrections: если True, подсвечиваются исправленные слова
+    :return: строка с HTML содержимым
+    """
+    def block_html(block):
+        return ''.join(runs_to_html(para, highlight_errors, highlight_corrections) for para in block['paragraphs'])
+
+    return blocks_to_html(
+        get_blocks(doc),
+        paragraph_html=block_html,
+        cell_html=block_html,
+        table_attrs=' style="border-collapse: collapse; border: 1px solid #000;"',
+        cell_attrs=' style="border: 1px solid #000; padding: 5px;"',
+    )
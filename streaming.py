@@ -0,0 +1,159 @@
+# streaming.py
+
+import time
+import shutil
+import zipfile
+import logging
+from typing import List, Optional, Tuple
+from lxml import etree
+from docx.oxml.ns import qn
+from docx.oxml.parser import element_class_lookup
+
+from blocks import iter_element_blocks, new_counters
+from engine import FORMAT_MODES, format_paragraph
+from rules import compile_rule_set
+from spelling import block_error_records
+from utiles import coalesce_runs
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_PART = 'word/document.xml'
+XML_DECLARATION = b"<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+
+def _process_block(element, counters: dict, rule_set: dict, mode: str, dictionary, errors: List[dict],
+                   verdicts: dict, allowlist=None) -> Tuple[int, int]:
+    """
+    Сжимает runs (utiles.coalesce_runs), проверяет орфографию и форматирует один элемент тела (w:p или w:tbl).
+    Блоки нумеруются тем же обходом, что и get_blocks, поэтому номера блоков в ошибках
+    совпадают с обработкой через python-docx. Результаты проверки слов (verdicts) общие
+    для всего документа: каждое уникальное слово проверяется один раз.
+
+    :return: (количество обработанных параграфов, количество удалённых runs).
+    """
+    paragraphs = 0
+    runs_removed = 0
+    for block in iter_element_blocks(element, None, counters):
+        for para in block['paragraphs']:
+            removed = coalesce_runs(para)
+            runs_removed += removed['empty'] + removed['merged']
+        if dictionary is not None:
+            errors.extend(block_error_records(block, dictionary, verdicts, allowlist))
+        for para in block['paragraphs']:
+            if rule_set['rules']:
+                format_paragraph(para, rule_set, mode)
+            paragraphs += 1
+    return paragraphs, runs_removed
+
+def _stream_document_xml(source, target, rule_set: dict, mode: str, dictionary, allowlist=None) -> dict:
+    """
+    Потоково разбирает word/document.xml, обрабатывает блоки тела по мере их завершения
+    и сразу записывает их в target. Обработанные блоки удаляются из дерева,
+    поэтому в памяти находится только текущий блок.
+
+    Парсер читает вперёд, и к моменту завершения блока в теле может быть уже начат следующий.
+    Поэтому блок переносится в отдельный корень с тем же набором пространств имён и
+    сериализуется там: объявления пространств имён остаются на корне, как при сохранении
+    через python-docx. Начало и конец части берутся из сериализации исходного корня.
+    """
+    context = etree.iterparse(source, events=('start', 'end'), remove_blank_text=True,
+                              resolve_entities=False, huge_tree=True)
+    context.set_element_class_lookup(element_class_lookup)
+
+    errors = []
+    body_tag = qn('w:body')
+    block_tags = (qn('w:p'), qn('w:tbl'))
+    root = None
+    body = None
+    skeleton_body = None
+    depth = 0
+    paragraphs = 0
+    runs_removed = 0
+    counters = new_counters()
+    verdicts = {}
+
+    for event, element in context:
+        if event == 'start':
+            if depth == 0:
+                root = element
+            elif depth == 1 and element.tag == body_tag:
+                body = element
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 2 or element.getparent() is not body:
+            continue
+
+        if element.tag in block_tags:
+            block_paragraphs, block_runs_removed = _process_block(element, counters, rule_set, mode, dictionary,
+                                                                  errors, verdicts, allowlist)
+            paragraphs += block_paragraphs
+            runs_removed += block_runs_removed
+
+        if skeleton_body is None:
+            serialized = etree.tostring(root, encoding='UTF-8', xml_declaration=False)
+            target.write(XML_DECLARATION)
+            target.write(serialized[:serialized.index(b'<w:body>') + len(b'<w:body>')])
+            skeleton_body = etree.SubElement(etree.Element(root.tag, nsmap=root.nsmap), body_tag)
+
+        skeleton_body.append(element)  # Переносит блок из разбираемого дерева
+        serialized = etree.tostring(skeleton_body.getparent(), encoding='UTF-8', xml_declaration=False)
+        target.write(serialized[serialized.index(b'<w:body>') + len(b'<w:body>'):serialized.rindex(b'</w:body>')])
+        skeleton_body.remove(element)
+
+    # Закрывающая часть документа: все блоки уже перенесены, тело пустое
+    serialized = etree.tostring(root, encoding='UTF-8', xml_declaration=False)
+    if skeleton_body is not None:
+        target.write(b'</w:body>')
+        target.write(serialized[serialized.index(b'<w:body/>') + len(b'<w:body/>'):])
+    else:
+        target.write(XML_DECLARATION)
+        target.write(serialized)
+
+    return {'blocks': counters['blocks'], 'paragraphs': paragraphs, 'runs_removed': runs_removed, 'errors': errors}
+
+def format_docx_streaming(source, target, selected_tasks: List[str], mode: str = 'run',
+                          dictionary=None, allowlist=None) -> dict:
+    """
+    Форматирует и проверяет .docx без построения объектной модели python-docx.
+    word/document.xml читается потоком из архива и записывается в новый архив;
+    остальные части копируются без изменений. Память почти не зависит от размера документа.
+
+    Runs параграфов сжимаются так же, как normalize_runs при обработке через python-docx, поэтому
+    результат в word/document.xml совпадает с normalize_runs и apply_selected_formats.
+    Орфография проверяется и runs сжимаются только в теле документа (колонтитулы хранятся в других частях).
+
+    :param source: Путь или файловый объект исходного .docx.
+    :param target: Путь или файловый объект для результата.
+    :param selected_tasks: Описания задач (ключи task2func).
+    :param mode: Режим применения правил: 'run' или 'paragraph'.
+    :param dictionary: Словарь spylls; если None, орфография не проверяется.
+    :param allowlist: Списки разрешённых слов (allowlist.py).
+    :return: Словарь с ключами 'history', 'errors', 'blocks', 'paragraphs', 'runs_removed', 'elapsed'.
+    """
+    if mode not in FORMAT_MODES:
+        raise ValueError(f"Неизвестный режим форматирования: '{mode}'")
+    started = time.perf_counter()
+    rule_set = compile_rule_set(tuple(selected_tasks))
+    for desc in rule_set['missing']:
+        logger.warning(f"Форматирующая задача с описанием '{desc}' не найдена.")
+
+    stats = None
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            info = zipfile.ZipInfo(item.filename, date_time=item.date_time)
+            info.compress_type = item.compress_type
+            info.external_attr = item.external_attr
+            with zin.open(item) as src, zout.open(info, 'w') as dst:
+                if item.filename == DOCUMENT_PART:
+                    stats = _stream_document_xml(src, dst, rule_set, mode, dictionary, allowlist)
+                else:
+                    shutil.copyfileobj(src, dst)
+
+    if stats is None:
+        raise ValueError(f"В архиве нет части {DOCUMENT_PART}")
+    stats['history'] = [rule['history'] for rule in rule_set['rules']]
+    stats['elapsed'] = time.perf_counter() - started
+    logger.info(f"Потоковое форматирование: блоков {stats['blocks']}, параграфов {stats['paragraphs']}, "
+                f"{stats['elapsed']:.2f} с")
+    return stats
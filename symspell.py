@@ -0,0 +1,215 @@
+# symspell.py
+"""
+Подбор вариантов исправления по индексу симметричных удалений (SymSpell) вместо suggest spylls.
+
+Для каждой словоформы словаря (см. wordforms.expand_forms) берётся префикс из PREFIX_LENGTH букв,
+и для каждого различного префикса заранее вычисляются все строки, получаемые удалением
+до MAX_DISTANCE букв. Для запроса удаления вычисляются так же; совпавшие строки дают
+префиксы-кандидаты, а словоформы с этими префиксами проверяются расстоянием Дамерау-Левенштейна.
+Запрос - несколько десятков поисков в отсортированном массиве вместо перебора правок в spylls.
+
+Индекс необязателен: его собирают заранее, и он используется, только если файл есть
+и соответствует словарю:
+    python symspell.py --build ru_RU
+"""
+
+import os
+import time
+import zlib
+import pickle
+import logging
+import argparse
+from array import array
+from bisect import bisect_left
+from itertools import combinations
+from typing import Iterable, List, Optional
+
+from dictionaries import dictionary_fingerprint, load_dictionary_with_snapshot
+from wordforms import expand_forms
+
+logger = logging.getLogger(__name__)
+
+SYMSPELL_SUFFIX = '.symspell'
+SYMSPELL_FORMAT = 1
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+
+def deletes(word: str, max_distance: int = MAX_DISTANCE) -> set:
+    """Строки, получаемые из word удалением от 0 до max_distance букв."""
+    result = {word}
+    for distance in range(1, min(max_distance, len(word)) + 1):
+        for positions in combinations(range(len(word)), distance):
+            result.add(''.join(char for i, char in enumerate(word) if i not in positions))
+    return result
+
+def _delete_key(text: str) -> int:
+    """32-битный ключ строки удаления; совпадения разных строк лишь добавляют кандидатов на проверку."""
+    return zlib.crc32(text.encode('utf-8'))
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Расстояние Дамерау-Левенштейна (с перестановкой соседних букв) между a и b.
+    Если оно больше limit, возвращается limit + 1 (строки таблицы прерываются досрочно).
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        char_a = a[i - 1]
+        for j in range(1, len(b) + 1):
+            cost = 0 if char_a == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[len(b)], limit + 1)
+
+class SymSpellIndex:
+    """
+    Индекс симметричных удалений над префиксами словоформ.
+    Поддерживает интерфейс suggest(word) словаря spylls, поэтому подключается
+    к CachedDictionary параметром suggester.
+    """
+
+    def __init__(self, groups: List[str], keys: array, stems: frozenset = frozenset(),
+                 max_distance: int = MAX_DISTANCE, prefix_length: int = PREFIX_LENGTH):
+        """
+        :param groups: Словоформы каждого префикса, через '\\n'; номер строки - номер префикса.
+        :param keys: Отсортированный массив (ключ удаления << 32 | номер префикса).
+        :param stems: Основы словаря (в нижнем регистре): при равном расстоянии они предлагаются первыми.
+        """
+        self.groups = groups
+        self.keys = keys
+        self.stems = stems
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+
+    @classmethod
+    def from_words(cls, words: Iterable[str], stems: Iterable[str] = (), max_distance: int = MAX_DISTANCE,
+                   prefix_length: int = PREFIX_LENGTH) -> 'SymSpellIndex':
+        """Строит индекс по словоформам (повторы допускаются)."""
+        grouped = {}
+        for word in set(words):
+            grouped.setdefault(word.lower()[:prefix_length], []).append(word)
+        groups = []
+        keys = array('Q')
+        for group_id, (prefix, group) in enumerate(grouped.items()):
+            groups.append('\n'.join(sorted(group)))
+            keys.extend(sorted({_delete_key(text) << 32 | group_id for text in deletes(prefix, max_distance)}))
+        keys = array('Q', sorted(keys))
+        return cls(groups, keys, frozenset(stem.lower() for stem in stems), max_distance, prefix_length)
+
+    def _candidate_groups(self, word: str) -> set:
+        keys = self.keys
+        found = set()
+        for text in deletes(word[:self.prefix_length], self.max_distance):
+            key = _delete_key(text) << 32
+            i = bisect_left(keys, key)
+            while i < len(keys) and keys[i] >> 32 == key >> 32:
+                found.add(keys[i] & 0xFFFFFFFF)
+                i += 1
+        return found
+
+    def lookup_candidates(self, word: str) -> List[tuple]:
+        """
+        Словоформы на расстоянии не больше max_distance от word (без учёта регистра).
+
+        :return: Список (расстояние, словоформа), отсортированный по рангу (см. suggest).
+        """
+        query = word.lower()
+        candidates = []
+        for group_id in self._candidate_groups(query):
+            for form in self.groups[group_id].split('\n'):
+                distance = edit_distance(query, form.lower(), self.max_distance)
+                if distance <= self.max_distance:
+                    candidates.append((distance, form))
+        # Ранг: расстояние, затем основа словаря, та же первая буква, близкая длина, алфавит
+        candidates.sort(key=lambda item: (item[0], item[1].lower() not in self.stems,
+                                          item[1][:1].lower() != query[:1],
+                                          abs(len(item[1]) - len(query)), item[1]))
+        return candidates
+
+    def suggest(self, word: str, limit: int = 5) -> List[str]:
+        """
+        Варианты исправления в регистре словаря (как у spylls); регистр слова
+        восстанавливает match_case в suggest_word. Само слово (без учёта регистра) не предлагается,
+        если в словаре оно записано так же.
+        """
+        return [form for distance, form in self.lookup_candidates(word) if form != word][:limit]
+
+    def memory_bytes(self) -> int:
+        """Приблизительная память индекса: массив ключей и строки словоформ."""
+        return self.keys.itemsize * len(self.keys) + sum(len(group) * 2 for group in self.groups)
+
+def build_symspell(path: str, index_path: Optional[str] = None, dictionary=None,
+                   prefix_length: int = PREFIX_LENGTH) -> SymSpellIndex:
+    """
+    Строит индекс по словоформам словаря и сохраняет его в файл (через временный файл и переименование).
+
+    :param path: Путь к словарю без расширения.
+    :param index_path: Файл индекса; по умолчанию path + '.symspell'.
+    :param dictionary: Уже загруженный словарь spylls.
+    :return: Индекс.
+    """
+    index_path = index_path or path + SYMSPELL_SUFFIX
+    if dictionary is None:
+        dictionary = load_dictionary_with_snapshot(path)
+    index = SymSpellIndex.from_words(expand_forms(dictionary), (word.stem for word in dictionary.dic.words),
+                                     prefix_length=prefix_length)
+    header = {'fingerprint': dictionary_fingerprint(path), 'format': SYMSPELL_FORMAT,
+              'max_distance': index.max_distance, 'prefix_length': index.prefix_length}
+    tmp_path = f'{index_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump((index.groups, index.stems, len(index.keys)), f, protocol=pickle.HIGHEST_PROTOCOL)
+        index.keys.tofile(f)
+    os.replace(tmp_path, index_path)
+    logger.info(f"Индекс SymSpell сохранён: {index_path} ({len(index.groups)} префиксов, {len(index.keys)} ключей)")
+    return index
+
+def load_symspell(path: str, index_path: Optional[str] = None) -> Optional[SymSpellIndex]:
+    """
+    Загружает индекс, если он собран и соответствует текущим .aff и .dic.
+    Индекс сам не собирается: сборка занимает около минуты и выполняется заранее (build_symspell).
+
+    :return: Индекс или None.
+    """
+    index_path = index_path or path + SYMSPELL_SUFFIX
+    if not os.path.exists(index_path):
+        return None
+    try:
+        with open(index_path, 'rb') as f:
+            header = pickle.load(f)
+            if header.get('format') != SYMSPELL_FORMAT or header.get('fingerprint') != dictionary_fingerprint(path):
+                logger.warning(f"Индекс SymSpell устарел, используется suggest spylls: {index_path}")
+                return None
+            groups, stems, size = pickle.load(f)
+            keys = array('Q')
+            keys.fromfile(f, size)
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать индекс SymSpell: {e}")
+        return None
+    return SymSpellIndex(groups, keys, stems, header['max_distance'], header['prefix_length'])
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Сборка индекса SymSpell для подбора вариантов исправления")
+    parser.add_argument('--build', metavar='PATH', required=True, help="Путь к словарю без расширения (ru_RU)")
+    parser.add_argument('--index', default=None, help="Файл индекса (по умолчанию PATH.symspell)")
+    parser.add_argument('--prefix-length', type=int, default=PREFIX_LENGTH, help="Длина индексируемого префикса")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    started = time.perf_counter()
+    index = build_symspell(args.build, args.index, prefix_length=args.prefix_length)
+    print(f"Префиксов: {len(index.groups)}, ключей: {len(index.keys)}, "
+          f"память: {index.memory_bytes() / 1024 / 1024:.1f} МБ, сборка: {time.perf_counter() - started:.1f} с")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,65 @@
+# test_blocks.py
+import gc
+import weakref
+
+import docx
+
+from blocks import get_blocks, invalidate_blocks
+
+def _document():
+    doc = docx.Document()
+    doc.add_paragraph('Первый параграф')
+    table = doc.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = 'Ячейка'
+    doc.add_paragraph('Последний параграф')
+    return doc
+
+def test_walked_document_is_collected():
+    doc = _document()
+    get_blocks(doc)
+    ref = weakref.ref(doc)
+    del doc
+    gc.collect()
+    assert ref() is None
+
+def test_cached_blocks_reused_while_structure_unchanged():
+    doc = _document()
+    assert get_blocks(doc) is get_blocks(doc)
+
+def test_blocks_rebuilt_after_body_paragraph_added():
+    doc = _document()
+    assert len(get_blocks(doc, ('paragraph',))) == 2
+    doc.add_paragraph('Новый')
+    assert len(get_blocks(doc, ('paragraph',))) == 3
+
+def test_blocks_rebuilt_after_table_row_added_and_invalidated():
+    doc = _document()
+    assert len(get_blocks(doc, ('cell',))) == 2
+    doc.tables[0].add_row()
+    invalidate_blocks(doc)
+    assert len(get_blocks(doc, ('cell',))) == 4
+
+def test_blocks_rebuilt_after_cell_paragraph_added_and_invalidated():
+    doc = _document()
+    get_blocks(doc)
+    doc.tables[0].cell(0, 1).add_paragraph('Новый')
+    invalidate_blocks(doc)
+    cell = get_blocks(doc, ('cell',))[1]
+    assert [para.text for para in cell['paragraphs']] == ['', 'Новый']
+
+def test_blocks_rebuilt_after_body_child_replaced():
+    doc = _document()
+    first = get_blocks(doc)[0]
+    old = doc.paragraphs[0]._p
+    new = docx.Document().add_paragraph('Замена')._p
+    old.addnext(new)
+    old.getparent().remove(old)
+    blocks = get_blocks(doc)
+    assert blocks[0] is not first
+    assert blocks[0]['paragraphs'][0].text == 'Замена'
+
+def test_invalidate_blocks():
+    doc = _document()
+    blocks = get_blocks(doc)
+    invalidate_blocks(doc)
+    assert get_blocks(doc) is not blocks
@@ -0,0 +1,93 @@
+# test_corrections.py
+import docx
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from lxml import etree
+
+from blocks import get_blocks
+from spelling import apply_user_selected_corrections_doc, find_errors_in_text, make_error_record
+
+FIXES = {'Превед': 'Привет', 'медвед': 'медведь'}
+
+class _Dictionary:
+    """Словарь, в котором нет только слов из FIXES."""
+
+    def lookup(self, word):
+        return word not in FIXES
+
+    def suggest(self, word):
+        return [FIXES[word]]
+
+def _document(*runs):
+    doc = docx.Document()
+    para = doc.add_paragraph()
+    for text in runs:
+        para.add_run(text)
+    return doc, para
+
+def _records(doc, para):
+    _, errors = find_errors_in_text(para.text, _Dictionary())
+    block = get_blocks(doc)[0]
+    return [make_error_record(block, 0, error) for error in errors]
+
+def _apply(doc, records, selected=None):
+    chosen = records if selected is None else [records[i] for i in selected]
+    return apply_user_selected_corrections_doc(doc, records, {r['checkbox_key']: True for r in chosen})
+
+def _green_texts(para):
+    return [r.xpath('string(./w:t)') for r in para._p.xpath('.//w:r')
+            if r.xpath('./w:rPr/w:shd[@w:fill="90EE90"]')]
+
+def _empty_runs(para):
+    return [r for r in para._p.xpath('.//w:r') if all(child.tag == qn('w:rPr') for child in r)]
+
+def test_two_corrections_in_one_run():
+    doc, para = _document('Превед и медвед тут')
+    _, applied = _apply(doc, _records(doc, para))
+    assert para.text == 'Привет и медведь тут'
+    assert [(a['original'], a['corrected']) for a in applied] == [('Превед', 'Привет'), ('медвед', 'медведь')]
+    assert [para.text[a['start']:a['end']] for a in applied] == ['Привет', 'медведь']
+    assert _green_texts(para) == ['Привет', 'медведь']
+    assert not _empty_runs(para)
+
+def test_each_correction_applied_once_at_its_offset():
+    doc, para = _document('Превед, снова Превед и Превед')
+    records = _records(doc, para)
+    _, applied = _apply(doc, records, selected=[1])
+    assert para.text == 'Превед, снова Привет и Превед'
+    assert len(applied) == 1
+    assert applied[0]['start'] == records[1]['start']
+    assert para.text[applied[0]['start']:applied[0]['end']] == 'Привет'
+    assert _green_texts(para) == ['Привет']
+
+def test_correction_across_run_boundary_is_skipped():
+    doc, para = _document('Пре', 'вед мир')
+    _, applied = _apply(doc, _records(doc, para))
+    assert applied == []
+    assert para.text == 'Превед мир'
+    assert _green_texts(para) == []
+
+def test_run_with_drawing_is_left_untouched():
+    doc, para = _document('Превед ')
+    para.runs[0]._r.append(OxmlElement('w:drawing'))
+    before = etree.tostring(para._p)
+    _, applied = _apply(doc, _records(doc, para))
+    assert applied == []
+    assert etree.tostring(para._p) == before
+
+def test_whole_run_correction_leaves_no_empty_runs():
+    doc, para = _document('Превед', ' мир ', 'медвед')
+    _, applied = _apply(doc, _records(doc, para))
+    assert para.text == 'Привет мир медведь'
+    assert len(applied) == 2
+    assert not _empty_runs(para)
+    assert _green_texts(para) == ['Привет', 'медведь']
+
+def test_correction_without_suggestions_is_skipped():
+    doc, para = _document('Превед мир')
+    records = _records(doc, para)
+    records[0]['suggestions'] = []
+    _, applied = _apply(doc, records)
+    assert applied == []
+    assert para.text == 'Превед мир'
+    assert _green_texts(para) == []
@@ -0,0 +1,65 @@
+# test_format_state.py
+from io import BytesIO
+
+import docx
+
+from app_function import apply_selected_formats, task2func
+
+TASKS = list(task2func)
+TEXTS = ['Сотрудник  отдела', 'См. п. 1.2 и «цитату»', 'Выявлено 5 %', 'Рост на 10 млн. руб']
+
+def _document() -> bytes:
+    doc = docx.Document()
+    for text in TEXTS:
+        doc.add_paragraph(text)
+    table = doc.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = 'Сотрудник  цеха'
+    table.cell(0, 1).text = 'a / b'
+    f = BytesIO()
+    doc.save(f)
+    return f.getvalue()
+
+def _texts(doc):
+    return [para.text for para in doc.paragraphs] + [cell.text for cell in doc.tables[0]._cells]
+
+def _format(data: bytes, state: dict, change=None):
+    doc = docx.Document(BytesIO(data))
+    if change is not None:
+        change(doc)
+    stats = {}
+    apply_selected_formats(doc, TASKS, state=state, stats=stats)
+    return doc, stats
+
+def test_only_changed_block_is_reformatted_in_a_fresh_copy():
+    data = _document()
+    state = {}
+    _, stats = _format(data, state)
+    assert stats['blocks_processed'] == 6
+
+    def change(doc):
+        doc.paragraphs[1].runs[0].text = 'См. п. 3.4 и «другую цитату»'
+
+    doc, stats = _format(data, state, change)
+    assert stats['blocks_processed'] == 1
+    assert stats['blocks_skipped'] == 5
+
+    reference, _ = _format(data, None, change)
+    assert _texts(doc) == _texts(reference)
+
+def test_formatted_document_is_skipped():
+    state = {}
+    doc, _ = _format(_document(), state)
+    f = BytesIO()
+    doc.save(f)
+    formatted, stats = _format(f.getvalue(), state)
+    assert stats['blocks_processed'] == 0
+    assert _texts(formatted) == _texts(doc)
+
+def test_state_reset_when_tasks_change():
+    data = _document()
+    state = {}
+    _format(data, state)
+    doc = docx.Document(BytesIO(data))
+    stats = {}
+    apply_selected_formats(doc, TASKS[:1], state=state, stats=stats)
+    assert stats['blocks_processed'] == 6
@@ -0,0 +1,71 @@
+# test_hyperlinks.py
+"""Спаны форматирования и орфографии в параграфе с гиперссылкой посередине."""
+
+import docx
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from app_function import apply_selected_formats, task2func
+from blocks import get_blocks
+from engine import detect_format_spans, document_text
+from spelling import find_errors_in_text, highlight_errors_in_doc, make_error_record
+from utiles import apply_highlights_to_docx, paragraph_runs
+
+EMPLOYEE_TASK = next(task for task in task2func if 'Сотрудник' in task)
+
+class _Dictionary:
+    """Словарь, в котором нет только слова «Сотрудник»."""
+
+    def lookup(self, word):
+        return word != 'Сотрудник'
+
+    def suggest(self, word):
+        return ['Работник']
+
+def _document_with_hyperlink():
+    doc = docx.Document()
+    para = doc.add_paragraph('Отчёт ')
+    hyperlink = OxmlElement('w:hyperlink')
+    link_run = OxmlElement('w:r')
+    link_text = OxmlElement('w:t')
+    link_text.text = 'по ссылке'
+    link_run.append(link_text)
+    hyperlink.append(link_run)
+    para._p.append(hyperlink)
+    para.add_run(': Сотрудник отдела')
+    return doc, para
+
+def _highlighted(para):
+    return [run.text for run in paragraph_runs(para)
+            if run.font.highlight_color is not None or run._r.xpath('./w:rPr/w:shd')]
+
+def test_document_text_includes_hyperlink():
+    doc, para = _document_with_hyperlink()
+    assert document_text(doc) == para.text == 'Отчёт по ссылке: Сотрудник отдела'
+
+def test_format_spans_after_hyperlink():
+    doc, para = _document_with_hyperlink()
+    _, found, error_spans, _ = detect_format_spans(doc, [EMPLOYEE_TASK])
+    assert [document_text(doc)[start:end] for start, end in error_spans] == ['Сотрудник']
+    assert para.text[found[0]['offset']:found[0]['offset'] + found[0]['length']] == 'Сотрудник'
+
+    apply_highlights_to_docx(doc, error_spans)
+    assert _highlighted(para) == ['Сотрудник']
+    assert para.text == 'Отчёт по ссылке: Сотрудник отдела'
+
+def test_spelling_and_format_spans_agree():
+    format_doc, format_para = _document_with_hyperlink()
+    _, _, error_spans, _ = detect_format_spans(format_doc, [EMPLOYEE_TASK])
+    apply_highlights_to_docx(format_doc, error_spans)
+
+    spelling_doc, spelling_para = _document_with_hyperlink()
+    block = get_blocks(spelling_doc)[0]
+    _, errors = find_errors_in_text(spelling_para.text, _Dictionary())
+    highlight_errors_in_doc(spelling_doc, [make_error_record(block, 0, error) for error in errors])
+
+    assert _highlighted(spelling_para) == _highlighted(format_para) == ['Сотрудник']
+
+def test_format_applied_after_hyperlink():
+    doc, para = _document_with_hyperlink()
+    apply_selected_formats(doc, [EMPLOYEE_TASK])
+    assert para.text == 'Отчёт по ссылке: Работник отдела'
@@ -0,0 +1,99 @@
+# test_rules.py
+import re
+
+import docx
+
+from app_function import apply_selected_formats
+from rules import (
+    ABBREVIATIONS, DASHES, DOCUMENT_NUMBERS, EMPLOYEE, IDENTIFIED, MULTIPLE_SPACES, PERCENT, QUOTES, SLASH,
+    compile_rule_set,
+)
+
+def _sub_all(patterns):
+    """Последовательные re.sub, как в исходных задачах taskes.py."""
+    def apply(text):
+        for pattern, replace_with in patterns:
+            text = re.sub(pattern, replace_with, text)
+        return text
+    return apply
+
+# Исходные реализации задач: правило -> преобразование текста одного run
+BASELINE = {
+    DOCUMENT_NUMBERS['name']: _sub_all([
+        (r"(п\.)\s*(\d[\d.]*)", r"\1\2"),
+        (r"(пп\.)\s*(\d[\d.]*)\s*-\s*(\d[\d.]*)", r"\1\2-\3"),
+        (r"№\s*(\d+)", r"№\1"),
+    ]),
+    QUOTES['name']: _sub_all([(r'"(.*?)"', r'«\1»')]),
+    ABBREVIATIONS['name']: _sub_all([
+        (r'\b(млн|млрд)\b\.?', r'\1'),
+        (r'\bтыс\b', 'тыс.'),
+        (r'\bруб\b', 'руб.'),
+    ]),
+    SLASH['name']: _sub_all([(r'\s*/\s*', '/')]),
+    PERCENT['name']: _sub_all([(r'\s+%', '%'), (r'%\s+', '%')]),
+    DASHES['name']: _sub_all([(r'\s*—\s*', ' — '), (r'(?<!\s)-(?!=\s)', '-')]),
+    IDENTIFIED['name']: lambda text: text.replace('Выявлено', 'Установлено'),
+    EMPLOYEE['name']: lambda text: text.replace('Сотрудник', 'Работник'),
+    MULTIPLE_SPACES['name']: _sub_all([(r' {2,}', ' ')]),
+}
+
+SAMPLES = [
+    'См. п. 1.2.3 и пп. 4.1 - 4.5, приказ № 12',
+    'пп.1.2-1.3 и п.5',
+    'Слово "в кавычках" и "ещё одно"',
+    'Незакрытая "кавычка',
+    '5 млн. руб и 3 млрд. тыс',
+    'млрд.руб',
+    'Итого 10 тыс руб.',
+    'a / b, c/ d и e /f',
+    'Рост 5 % и 7%  годовых',
+    'Дата — 2020 - 2021, северо-запад',
+    'Выявлено нарушение. Выявлено повторно',
+    'Сотрудник и Сотрудники отдела',
+    'Много    пробелов  здесь',
+    'Текст без правок',
+]
+
+def _format_runs(texts, tasks, mode='run'):
+    doc = docx.Document()
+    para = doc.add_paragraph()
+    for text in texts:
+        para.add_run(text)
+    apply_selected_formats(doc, tasks, mode=mode)
+    return para.text
+
+def test_run_mode_matches_baseline_per_task():
+    for name, baseline in BASELINE.items():
+        for sample in SAMPLES:
+            assert _format_runs([sample], [name]) == baseline(sample), (name, sample)
+
+def test_run_mode_matches_baseline_for_all_tasks_in_order():
+    names = list(BASELINE)
+    for sample in SAMPLES:
+        expected = sample
+        for name in names:
+            expected = BASELINE[name](expected)
+        assert _format_runs([sample], names) == expected, sample
+
+def test_trigger_finds_every_changed_sample():
+    trigger = compile_rule_set(tuple(BASELINE))['trigger']
+    for name, baseline in BASELINE.items():
+        for sample in SAMPLES:
+            if baseline(sample) != sample:
+                assert trigger.search(sample), (name, sample)
+
+def test_paragraph_mode_matches_across_runs():
+    assert _format_runs(['См. п.', ' 1.2'], [DOCUMENT_NUMBERS['name']], mode='paragraph') == 'См. п.1.2'
+    assert _format_runs(['приказ №', ' 3'], [DOCUMENT_NUMBERS['name']], mode='paragraph') == 'приказ №3'
+    assert _format_runs(['Слово "в кав', 'ычках" далее'], [QUOTES['name']], mode='paragraph') == 'Слово «в кавычках» далее'
+
+def test_run_mode_leaves_cross_run_matches():
+    assert _format_runs(['См. п.', ' 1.2'], [DOCUMENT_NUMBERS['name']]) == 'См. п. 1.2'
+    assert _format_runs(['Слово "в кав', 'ычках"'], [QUOTES['name']]) == 'Слово "в кавычках"'
+
+def test_abbreviations_keep_sequential_order():
+    assert ABBREVIATIONS['steps'] and len(ABBREVIATIONS['steps']) == 3
+    for mode in ('run', 'paragraph'):
+        assert _format_runs(['млрд.руб'], [ABBREVIATIONS['name']], mode=mode) == 'млрдруб'
+        assert _format_runs(['5 млн. руб'], [ABBREVIATIONS['name']], mode=mode) == '5 млн руб.'
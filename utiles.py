@@ -1,9 +1,14 @@
 # utils.py
 import re
-from typing import Tuple, List
+from copy import deepcopy
+from typing import Callable, Tuple, List, Optional
 from docx import Document
 from docx.enum.text import WD_COLOR_INDEX
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.text.run import Run
 from io import BytesIO
+from lxml import etree
 
 def clean_indices(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
     """Фильтрует перекрывающиеся индексы."""
@@ -35,94 +40,240 @@ def insert_highlights(text: str, fix_spans: List[Tuple[int, int]], color: str =
 from docx import Document
 import re
 
+from blocks import get_blocks, blocks_to_html, BODY_KINDS
+
+def _runs_to_html(para) -> str:
+    """HTML параграфа: подсвеченные runs оборачиваются в <mark>."""
+    para_html = ""
+    for run in paragraph_runs(para):
+        text = run.text
+        if run.font.highlight_color:
+            color = 'blue'  # Можно добавить другие цвета по необходимости
+            para_html += f'<mark style="background-color: {color};">{text}</mark>'
+        else:
+            para_html += text
+    return para_html
+
 def convert_docx_to_html(doc: Document) -> str:
     """
     Конвертирует docx в HTML с подсветкой исправлений.
+    Параграфы и таблицы (включая вложенные) выводятся в порядке документа.
+    """
+    return blocks_to_html(
+        get_blocks(doc, BODY_KINDS),
+        paragraph_html=lambda block: f"<p>{_runs_to_html(block['paragraphs'][0])}</p>",
+        # Параграфы в ячейке разделяются <br>
+        cell_html=lambda block: ''.join(_runs_to_html(para) + "<br>" for para in block['paragraphs']),
+    )
+
+# Элементы run, которые можно разрезать: текст, табуляции и переводы строк (рисунки, поля и т.п. - нельзя)
+SPLITTABLE_RUN_CHILDREN = {qn('w:rPr'), qn('w:t'), qn('w:tab'), qn('w:br'), qn('w:cr')}
+
+def shading(fill: str) -> Callable:
+    """Функция форматирования для replace_spans: заливка run цветом fill (w:shd)."""
+    def apply(run):
+        rPr = run._element.get_or_add_rPr()
+        shading_elm = rPr.find(qn('w:shd'))
+        if shading_elm is None:
+            shading_elm = OxmlElement('w:shd')
+            rPr.append(shading_elm)
+        shading_elm.set(qn('w:fill'), fill)
+    return apply
+
+def paragraph_runs(para) -> List[Run]:
+    """Runs параграфа в порядке текста, включая runs гиперссылок: их тексты вместе дают para.text."""
+    return [Run(r, para) for r in para._p.xpath('./w:r | ./w:hyperlink/w:r')]
+
+def split_run(run: Run, spans: List[tuple]) -> List[Run]:
+    """
+    Разрезает run на месте по участкам его текста. Новые w:r вставляются сразу за исходным
+    (порядок текста сохраняется) и копируют его форматирование; пустые куски не создаются,
+    поэтому на каждый участок добавляется не больше двух runs.
+
+    :param run: Run только с текстом (см. SPLITTABLE_RUN_CHILDREN).
+    :param spans: Участки (start, end, текст или None - оставить прежний, функция форматирования run или None)
+                  со смещениями в run.text, по возрастанию, без перекрытий.
+    :return: Runs, получившиеся на месте исходного, по порядку (пустой список, если текста не осталось).
+    """
+    text = run.text
+    pieces = []
+    cursor = 0
+    for start, end, replacement, formatter in spans:
+        if start > cursor:
+            pieces.append((text[cursor:start], None))
+        pieces.append((text[start:end] if replacement is None else replacement, formatter))
+        cursor = end
+    if cursor < len(text):
+        pieces.append((text[cursor:], None))
+
+    template = deepcopy(run._r)
+    result = []
+    for piece_text, formatter in pieces:
+        if not piece_text:
+            continue
+        if result:
+            target = Run(deepcopy(template), run._parent)
+            result[-1]._r.addnext(target._r)
+        else:
+            target = run
+        target.text = piece_text
+        if formatter is not None:
+            formatter(target)
+        result.append(target)
+    if not result:
+        run._r.getparent().remove(run._r)  # Весь текст run заменён пустой строкой
+    return result
+
+def replace_spans(para, spans: List[tuple]) -> List[int]:
+    """
+    Заменяет или форматирует участки текста параграфа за один проход по его runs:
+    все участки одного run обрабатываются одним вызовом split_run.
+    Участок без замены текста (None), пересекающий границу runs, форматируется по частям в каждом run;
+    замена текста, пересекающая границу, и участки в runs с рисунками или полями пропускаются.
+
+    :param spans: Список (start, end, текст или None, функция форматирования run или None);
+                  смещения - в para.text, участки не перекрываются.
+    :return: Номера применённых участков в списке spans.
+    """
+    order = sorted(range(len(spans)), key=lambda i: spans[i][0])
+    applied = set()
+    pos = 0
+    k = 0
+    for run in paragraph_runs(para):
+        run_start = pos
+        run_end = pos + len(run.text)
+        pos = run_end
+        while k < len(order) and spans[order[k]][1] <= run_start:
+            k += 1
+        local = []
+        j = k
+        while j < len(order) and spans[order[j]][0] < run_end:
+            i = order[j]
+            start, end, replacement, formatter = spans[i]
+            if replacement is None:
+                local.append((i, (max(start, run_start) - run_start, min(end, run_end) - run_start, None, formatter)))
+            elif start >= run_start and end <= run_end:
+                local.append((i, (start - run_start, end - run_start, replacement, formatter)))
+            j += 1
+        if not local or any(child.tag not in SPLITTABLE_RUN_CHILDREN for child in run._r):
+            continue
+        split_run(run, [span for _, span in local])
+        applied.update(i for i, _ in local)
+    return sorted(applied)
+
+def _run_is_empty(r) -> bool:
+    """Run без содержимого: только свойства и пустые w:t."""
+    return all(child.tag == qn('w:rPr') or (child.tag == qn('w:t') and not child.text) for child in r)
+
+def _run_format_key(r) -> Optional[bytes]:
+    """
+    Ключ форматирования run (сериализованный w:rPr) или None, если run нельзя сливать
+    (в нём рисунок, поле, сноска и т.п.). Атрибуты w:r (w:rsidR и др.) не учитываются.
+    """
+    if any(child.tag not in SPLITTABLE_RUN_CHILDREN for child in r):
+        return None
+    rPr = r.find(qn('w:rPr'))
+    return etree.tostring(rPr) if rPr is not None else b''
+
+def _append_run_content(target, source):
+    """Переносит текст source в конец target; соседние w:t объединяются в один."""
+    for child in list(source):
+        if child.tag == qn('w:rPr'):
+            continue
+        last = target[-1] if len(target) else None
+        if child.tag == qn('w:t') and last is not None and last.tag == qn('w:t'):
+            last.text = (last.text or '') + (child.text or '')
+            if last.text != last.text.strip():
+                last.set(qn('xml:space'), 'preserve')
+        else:
+            target.append(child)
+
+def coalesce_runs(para) -> dict:
+    """
+    Нормализует runs параграфа (и гиперссылок в нём): удаляет пустые runs и пометки проверки
+    правописания Word (w:proofErr), сливает соседние runs с одинаковым форматированием.
+    Текст параграфа не меняется.
+
+    :return: Счётчики {'empty': удалено пустых runs, 'merged': слито runs, 'proof_errors': удалено w:proofErr}.
+    """
+    counts = {'empty': 0, 'merged': 0, 'proof_errors': 0}
+    for container in [para._p] + para._p.xpath('./w:hyperlink'):
+        for proof_err in container.findall(qn('w:proofErr')):
+            container.remove(proof_err)
+            counts['proof_errors'] += 1
+        previous = None
+        previous_key = None
+        for child in list(container):
+            if child.tag != qn('w:r'):
+                previous = None  # Закладки, поля и правки разделяют runs: через них не сливаем
+                continue
+            if _run_is_empty(child):
+                container.remove(child)
+                counts['empty'] += 1
+                continue
+            key = _run_format_key(child)
+            if previous is not None and key is not None and key == previous_key:
+                _append_run_content(previous, child)
+                container.remove(child)
+                counts['merged'] += 1
+                continue
+            previous, previous_key = child, key
+    return counts
+
+def normalize_runs(doc: Document) -> dict:
+    """
+    Сжимает runs всех параграфов документа (основной текст, таблицы, колонтитулы), см. coalesce_runs.
+    Вызывается после загрузки и перед сохранением: после подсветок, исправлений и правок Word
+    в параграфах копятся пустые runs и соседние runs с одинаковым форматированием, а все задачи
+    и конвертеры в HTML обходят их каждый раз.
+
+    :return: Счётчики: 'runs_before', 'runs_after', 'runs_removed', 'empty', 'merged', 'proof_errors'.
     """
-    html = ""
-
-    for para in doc.paragraphs:
-        para_html = ""
-        for run in para.runs:
-            text = run.text
-            if run.font.highlight_color:
-                # Определяем цвет подсветки
-                if run.font.highlight_color == 1:  # WD_COLOR_INDEX.YELLOW
-                    color = 'blue'
-                else:
-                    color = 'blue'  # Можно добавить другие цвета по необходимости
-                para_html += f'<mark style="background-color: {color};">{text}</mark>'
-            else:
-                para_html += text
-        html += f"<p>{para_html}</p>"
-
-    # Обработка таблиц (опционально)
-    for table in doc.tables:
-        html += "<table>"
-        for row in table.rows:
-            html += "<tr>"
-            for cell in row.cells:
-                cell_html = ""
-                for para in cell.paragraphs:
-                    for run in para.runs:
-                        text = run.text
-                        if run.font.highlight_color:
-                            if run.font.highlight_color == 1:  # WD_COLOR_INDEX.BLUE
-                                color = 'blue'
-                            else:
-                                color = 'blue'
-                            cell_html += f'<mark style="background-color: {color};">{text}</mark>'
-                        else:
-                            cell_html += text
-                    cell_html += "<br>"  # Разделение параграфов в ячейке
-                html += f"<td>{cell_html}</td>"
-            html += "</tr>"
-        html += "</table>"
-
-    return html
+    totals = {'empty': 0, 'merged': 0, 'proof_errors': 0}
+    runs_before = 0
+    for block in get_blocks(doc):
+        for para in block['paragraphs']:
+            runs_before += len(para._p.xpath('./w:r | ./w:hyperlink/w:r'))
+            for key, value in coalesce_runs(para).items():
+                totals[key] += value
+    removed = totals['empty'] + totals['merged']
+    return {'runs_before': runs_before, 'runs_after': runs_before - removed, 'runs_removed': removed, **totals}
 
 def apply_highlights_to_docx(doc: Document, fix_spans: List[Tuple[int, int]], color: str = 'blue'):
     """
     Применяет подсветку к указанным спанам в документе DOCX.
+    Runs разрезаются на месте (replace_spans), порядок текста не меняется.
     
     :param doc: Объект Document.
-    :param fix_spans: Список спанов (start, end) для подсветки.
-    :param color: Цвет подсветки (по умолчанию 'yellow').
+    :param fix_spans: Список спанов (start, end) в тексте документа (параграфы через перевод строки).
+    :param color: Цвет подсветки (по умолчанию 'blue').
     """
-    fix_spans = clean_indices(fix_spans or [])
-    current_pos = 0
+    merged = []  # Перекрывающиеся спаны объединяются: replace_spans принимает участки без перекрытий
+    for start, end in sorted(fix_spans or []):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    fix_spans = merged
+    highlight_color = getattr(WD_COLOR_INDEX, color.upper(), WD_COLOR_INDEX.BLUE)
+
+    def highlight(run):
+        run.font.highlight_color = highlight_color
 
-    for para in doc.paragraphs:
+    current_pos = 0
+    k = 0
+    # Параграфы в том же порядке, что и в document_text: основной текст и ячейки таблиц
+    for para in [para for block in get_blocks(doc, BODY_KINDS) for para in block['paragraphs']]:
         para_length = len(para.text)
         spans_in_para = []
-
-        for start, end in fix_spans:
-            if start >= current_pos and end <= current_pos + para_length:
-                spans_in_para.append((start - current_pos, end - current_pos))
-        
-        for run in para.runs:
-            run_length = len(run.text)
-            run_start = current_pos
-            run_end = current_pos + run_length
-
-            for span_start, span_end in spans_in_para:
-                if span_start < run_length and span_end > 0:
-                    highlight_start = max(span_start, 0)
-                    highlight_end = min(span_end, run_length)
-                    if highlight_start < highlight_end:
-                        before = run.text[:highlight_start]
-                        highlight_text = run.text[highlight_start:highlight_end]
-                        after = run.text[highlight_end:]
-
-                        run.text = before
-
-                        if highlight_text:
-                            highlighted_run = para.add_run(highlight_text)
-                            highlighted_run.font.highlight_color = WD_COLOR_INDEX.BLUE  # Выберите нужный цвет
-
-                        if after:
-                            after_run = para.add_run(after)
-                        break  # Переходим к следующему run после изменения
+        while k < len(fix_spans) and fix_spans[k][0] < current_pos + para_length:
+            start, end = fix_spans[k]
+            if start >= current_pos:
+                spans_in_para.append((start - current_pos, min(end, current_pos + para_length) - current_pos,
+                                      None, highlight))
+            k += 1
+        if spans_in_para:
+            replace_spans(para, spans_in_para)
 
         current_pos += para_length + 1  # +1 для перевода строки
 
@@ -0,0 +1,224 @@
+# wordforms.py
+"""
+Множество словоформ словаря для быстрой проверки правильных слов.
+
+Из основ .dic и правил SFX в .aff заранее порождаются все словоформы, а их 64-битные хэши
+складываются в хэш-таблицу с открытой адресацией (один массив array('Q')). Проверка слова -
+одно хэширование и несколько сравнений чисел; слова, которых нет в таблице, проверяются в spylls.
+Около 1,4 млн словоформ ru_RU занимают 16 МБ (множество строк Python заняло бы больше 150 МБ).
+
+Сборка индекса (рядом со снимком словаря, см. dictionaries.py):
+    python wordforms.py --build ru_RU
+"""
+
+import os
+import pickle
+import hashlib
+import logging
+import argparse
+from array import array
+from typing import Iterator, List, Optional
+
+from dictionaries import dictionary_fingerprint, load_dictionary_with_snapshot
+
+logger = logging.getLogger(__name__)
+
+FORMS_SUFFIX = '.forms'
+FORMS_FORMAT = 1
+
+# Доля заполнения таблицы: при большей цепочки проб заметно удлиняются
+MAX_LOAD = 0.7
+
+# Директивы .aff, меняющие сами слова перед проверкой: с ними множество словоформ не строится
+UNSUPPORTED_DIRECTIVES = ('IGNORE', 'ICONV', 'CHECKSHARPS', 'FORCEUCASE')
+
+def word_hash(word: str) -> int:
+    """Стабильный между процессами 64-битный хэш слова (0 зарезервирован под пустую ячейку)."""
+    value = int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+    return value or 1
+
+def case_variants(word: str) -> tuple:
+    """
+    Написания слова, которые нужно искать в словаре, - те же, что проверяет spylls:
+    «Слово» ищется и как «слово», «СЛОВО» - как «слово» и «Слово».
+    """
+    lower = word.lower()
+    if lower == word:
+        return (word,)
+    if word == word.capitalize():
+        return (word, lower)
+    if word.isupper():
+        return (word, lower, word.capitalize())
+    return (word,)
+
+class WordForms:
+    """
+    Хэш-таблица словоформ с линейным пробированием.
+    Хранятся только хэши, поэтому совпадение хэша слова с чужим даёт ложное «слово есть»;
+    при 64-битном хэше и 1,4 млн форм вероятность этого для одного слова около 1e-13.
+    """
+
+    def __init__(self, table: array, count: int):
+        """
+        :param table: Массив хэшей размером в степень двойки; 0 - пустая ячейка.
+        :param count: Число словоформ в таблице.
+        """
+        self.table = table
+        self.count = count
+        self._mask = len(table) - 1
+
+    @classmethod
+    def from_words(cls, words: Iterator[str]) -> 'WordForms':
+        """Строит таблицу из словоформ (повторы допускаются)."""
+        hashes = {word_hash(word) for word in words}
+        size = 1
+        while size * MAX_LOAD < len(hashes):
+            size <<= 1
+        table = array('Q', [0]) * size
+        mask = size - 1
+        for value in hashes:
+            slot = value & mask
+            while table[slot]:
+                slot = (slot + 1) & mask
+            table[slot] = value
+        return cls(table, len(hashes))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, word: str) -> bool:
+        value = word_hash(word)
+        table = self.table
+        mask = self._mask
+        slot = value & mask
+        while True:
+            stored = table[slot]
+            if stored == value:
+                return True
+            if not stored:
+                return False
+            slot = (slot + 1) & mask
+
+    def accepts(self, word: str) -> bool:
+        """
+        Принимает слово, если оно или его вариант регистра (case_variants) есть среди словоформ.
+        False не означает ошибку: слово нужно проверить в spylls.
+        """
+        return any(variant in self for variant in case_variants(word))
+
+    def memory_bytes(self) -> int:
+        """Память, занятая таблицей."""
+        return self.table.itemsize * len(self.table)
+
+def _unsupported(aff) -> List[str]:
+    return [name for name in UNSUPPORTED_DIRECTIVES if getattr(aff, name, None)]
+
+def expand_forms(dictionary) -> Iterator[str]:
+    """
+    Порождает словоформы словаря spylls: основы и один уровень суффиксов SFX.
+    Формы, которые spylls не принял бы (основы с флагами NEEDAFFIX, ONLYINCOMPOUND, KEEPCASE,
+    CIRCUMFIX, FORBIDDENWORD и формы с такими флагами суффикса), пропускаются;
+    приставки (PFX) и составные слова не порождаются - такие слова проверяет spylls.
+    """
+    aff = dictionary.aff
+    skip = {flag for flag in (aff.NEEDAFFIX, aff.ONLYINCOMPOUND, aff.KEEPCASE, aff.CIRCUMFIX,
+                              aff.FORBIDDENWORD) if flag}
+    forbidden = set()
+    for word in dictionary.dic.words:
+        if aff.FORBIDDENWORD and aff.FORBIDDENWORD in word.flags:
+            forbidden.add(word.stem)
+        if word.flags & skip:
+            continue
+        stem = word.stem
+        yield stem
+        for flag in word.flags:
+            for suffix in aff.SFX.get(flag, ()):
+                if suffix.flags & skip or not suffix.cond_regexp.search(stem):
+                    continue
+                base = stem[:len(stem) - len(suffix.strip)] if suffix.strip else stem
+                form = base + suffix.add
+                if form not in forbidden:
+                    yield form
+    if forbidden:
+        logger.debug(f"Запрещённых слов в словаре: {len(forbidden)}")
+
+def build_word_forms(path: str, forms_path: Optional[str] = None, dictionary=None) -> Optional[WordForms]:
+    """
+    Строит множество словоформ и сохраняет его в файл (через временный файл и переименование).
+
+    :param path: Путь к словарю без расширения.
+    :param forms_path: Файл индекса; по умолчанию path + '.forms'.
+    :param dictionary: Уже загруженный словарь spylls.
+    :return: Множество словоформ или None, если .aff использует неподдерживаемые директивы.
+    """
+    forms_path = forms_path or path + FORMS_SUFFIX
+    if dictionary is None:
+        dictionary = load_dictionary_with_snapshot(path)
+    unsupported = _unsupported(dictionary.aff)
+    if unsupported:
+        logger.warning(f"Множество словоформ не строится, директивы .aff не поддерживаются: {unsupported}")
+        return None
+
+    forms = WordForms.from_words(expand_forms(dictionary))
+    header = {'fingerprint': dictionary_fingerprint(path), 'format': FORMS_FORMAT,
+              'count': forms.count, 'size': len(forms.table)}
+    tmp_path = f'{forms_path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            forms.table.tofile(f)
+        os.replace(tmp_path, forms_path)
+        logger.info(f"Множество словоформ сохранено: {forms_path} ({forms.count} форм)")
+    except OSError as e:
+        logger.warning(f"Не удалось сохранить множество словоформ: {e}")
+    return forms
+
+def read_word_forms(path: str, forms_path: Optional[str] = None) -> Optional[WordForms]:
+    """
+    Читает множество словоформ из файла, если он соответствует текущим .aff и .dic.
+
+    :return: Множество словоформ или None, если файла нет или он устарел.
+    """
+    forms_path = forms_path or path + FORMS_SUFFIX
+    if not os.path.exists(forms_path):
+        return None
+    with open(forms_path, 'rb') as f:
+        header = pickle.load(f)
+        if header.get('format') != FORMS_FORMAT or header.get('fingerprint') != dictionary_fingerprint(path):
+            logger.info(f"Множество словоформ устарело: {forms_path}")
+            return None
+        table = array('Q')
+        table.fromfile(f, header['size'])
+    return WordForms(table, header['count'])
+
+def load_word_forms(path: str, forms_path: Optional[str] = None, dictionary=None) -> Optional[WordForms]:
+    """
+    Загружает множество словоформ из файла, а если его нет или он устарел - строит заново.
+
+    :param dictionary: Уже загруженный словарь spylls (нужен только для сборки).
+    :return: Множество словоформ или None, если его нельзя построить для этого словаря.
+    """
+    try:
+        forms = read_word_forms(path, forms_path)
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать множество словоформ: {e}")
+        forms = None
+    if forms is not None:
+        return forms
+    return build_word_forms(path, forms_path, dictionary=dictionary)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Сборка множества словоформ словаря hunspell")
+    parser.add_argument('--build', metavar='PATH', required=True, help="Путь к словарю без расширения (ru_RU)")
+    parser.add_argument('--forms', default=None, help="Файл индекса (по умолчанию PATH.forms)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    forms = build_word_forms(args.build, args.forms)
+    if forms is None:
+        return 1
+    print(f"Словоформ: {forms.count}, таблица: {forms.memory_bytes() / 1024 / 1024:.1f} МБ")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())